@@ -0,0 +1,765 @@
+import itertools
+import math
+import multiprocessing
+import os
+import random
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from encoding import WorkerState
+
+# Engines selectable with ?engine= on the allocation endpoints
+ALLOCATION_ENGINES = ['heuristic', 'optimal']
+
+# Tolerance when comparing float costs
+EPSILON = 1e-9
+
+def apply_heuristic_model(workers, calibration_items, w1=2.7, w2=2.0, w3=2.3,
+                          min_workload=10, max_deviation=5, verbose=True):
+    """
+    Apply a heuristic model to optimize worker allocation based on:
+    1. Balancing workload among workers (highest priority)
+    2. Considering location grouping (calibrator) (higher priority)
+    3. Considering deadline grouping (calibration_due) (higher priority)
+    4. Ensuring each worker's workload is within ±max_deviation tasks from average
+    
+    w1, w2 and w3 weight the three penalties; min_workload is the least each
+    worker should get. verbose=False silences the debugging output (e.g. in sweeps).
+    
+    Returns a list of tuples (worker_id, optimized_load)
+    """
+    if not workers or len(workers) == 0:
+        return []
+    
+    log = print if verbose else (lambda *args: None)
+    
+    # Initialize worker tracking
+    worker_data = {worker: WorkerState() for worker in workers}
+    
+    # Current workloads
+    workloads = {worker: 0 for worker in workers}
+    
+    # Group tasks by location and deadline
+    task_groups = {}
+    for item in calibration_items:
+        calibrator, serial_no, due_date, _ = item
+        key = (calibrator, due_date)
+        if key not in task_groups:
+            task_groups[key] = []
+        task_groups[key].append(item)
+    
+    # Function to get average workload
+    def get_avg_workload():
+        return int(sum(workloads.values()) / max(len(workloads), 1))
+    
+    # Heuristic function to score workers for a task
+    def heuristic(worker, location, due_date):
+        avg_workload = get_avg_workload()
+        
+        # Workload penalty: Higher deviation = higher penalty
+        workload_penalty = abs(workloads[worker] - avg_workload)
+        
+        # Location penalty: Prefer same location
+        location_penalty = 0 if location in worker_data[worker].locations else 1
+        
+        # Deadline penalty: Reward workers with the same deadline
+        deadline_penalty = 0 if due_date in worker_data[worker].deadlines else 1
+        deadline_reward = -0.5 if due_date in worker_data[worker].deadlines else 0
+        
+        # Calculate total penalty
+        total_penalty = (w1 * workload_penalty) + (w2 * location_penalty) + (w3 * (deadline_penalty + deadline_reward))
+        
+        return total_penalty
+    
+    # Sort task groups by due date (earliest first)
+    sorted_task_groups = sorted(task_groups.items(), key=lambda x: x[0][1])
+    
+    # Assign tasks using heuristic scoring
+    new_assignments = []
+    for (location, due_date), group in sorted_task_groups:
+        for item in group:
+            # Pick the best worker using the heuristic
+            best_worker = min(workers, key=lambda w: heuristic(w, location, due_date))
+            
+            # Assign task to the best worker
+            new_assignments.append((best_worker, item[1]))  # (worker_id, serial_no)
+            
+            # Update worker data
+            workloads[best_worker] += 1  # Increment workload
+            state = worker_data[best_worker]
+            state.assigned_load += 1
+            state.locations.add(location)
+            state.deadlines.add(due_date)
+    
+    # Ensure minimum workload for each worker
+    total_items = sum(workloads.values())
+    
+    # First pass: identify workers below minimum
+    workers_below_min = [w for w in workers if workloads[w] < min_workload]
+    
+    if workers_below_min and total_items >= len(workers) * min_workload:
+        # Calculate how many items we need to redistribute
+        items_needed = sum(min_workload - workloads[w] for w in workers_below_min)
+        
+        # Identify workers who can give up items
+        donors = [w for w in workers if workloads[w] > min_workload]
+        
+        if donors:
+            # Calculate how many items each donor can give
+            items_to_take = {}
+            remaining_needed = items_needed
+            
+            # Sort donors by workload (highest first)
+            sorted_donors = sorted(donors, key=lambda w: workloads[w], reverse=True)
+            
+            for donor in sorted_donors:
+                # Calculate how many items this donor can give
+                available = workloads[donor] - min_workload
+                to_take = min(available, remaining_needed)
+                
+                if to_take > 0:
+                    items_to_take[donor] = to_take
+                    remaining_needed -= to_take
+                
+                if remaining_needed <= 0:
+                    break
+            
+            # Redistribute items
+            for donor, to_take in items_to_take.items():
+                workloads[donor] -= to_take
+                
+                # Distribute to workers below minimum
+                for recipient in workers_below_min:
+                    needed = min_workload - workloads[recipient]
+                    if needed > 0:
+                        given = min(needed, to_take)
+                        workloads[recipient] += given
+                        to_take -= given
+                    
+                    if to_take <= 0:
+                        break
+    
+    # Rebalance workload to ensure each worker is within ±max_deviation tasks from average
+    avg_workload = get_avg_workload()
+    
+    # Identify workers outside the allowed range
+    overloaded_workers = [w for w in workers if workloads[w] > avg_workload + max_deviation]
+    underloaded_workers = [w for w in workers if workloads[w] < avg_workload - max_deviation]
+    
+    # Only proceed with rebalancing if there are workers outside the allowed range
+    if overloaded_workers and underloaded_workers:
+        log(f"Rebalancing workload: Average = {avg_workload}, Allowed range = [{avg_workload - max_deviation}, {avg_workload + max_deviation}]")
+        log(f"Overloaded workers: {overloaded_workers}")
+        log(f"Underloaded workers: {underloaded_workers}")
+        
+        # Sort workers by workload (highest to lowest for overloaded, lowest to highest for underloaded)
+        overloaded_workers.sort(key=lambda w: workloads[w], reverse=True)
+        underloaded_workers.sort(key=lambda w: workloads[w])
+        
+        # Redistribute tasks from overloaded to underloaded workers
+        for donor in overloaded_workers:
+            # Calculate how many tasks need to be redistributed
+            excess = workloads[donor] - (avg_workload + max_deviation)
+            
+            if excess <= 0:
+                continue  # Skip if worker is now within range
+            
+            log(f"Worker {donor} needs to give up {excess} tasks")
+            
+            # Redistribute to underloaded workers
+            for recipient in underloaded_workers:
+                # Calculate how many tasks this recipient can take
+                deficit = (avg_workload - max_deviation) - workloads[recipient]
+                
+                if deficit <= 0:
+                    continue  # Skip if worker is now within range
+                
+                # Transfer tasks
+                transfer = min(excess, deficit)
+                workloads[donor] -= transfer
+                workloads[recipient] += transfer
+                excess -= transfer
+                
+                log(f"Transferred {transfer} tasks from {donor} to {recipient}")
+                
+                if excess <= 0:
+                    break  # Done redistributing from this donor
+    
+    # Calculate final workload distribution
+    final_workloads = [(worker, workloads[worker]) for worker in workers]
+    
+    # Print for debugging
+    log("Initial workloads:", {w: 0 for w in workers})
+    log("Final workloads after rebalancing:", dict(final_workloads))
+    log("Average workload:", avg_workload)
+    log("Allowed range:", [avg_workload - max_deviation, avg_workload + max_deviation])
+    log("Total items before:", len(calibration_items))
+    log("Total items after:", sum(load for _, load in final_workloads))
+    
+    return final_workloads
+
+def assign_items_to_target_loads(workers, calibration_items, optimized_worker_loads):
+    """
+    Map each serial_no to a worker so that every worker ends up with the load
+    the heuristic picked, keeping items with the same calibrator and due date
+    together where possible.
+    Returns a list of (worker_id, serial_no) tuples
+    """
+    # Convert optimized_worker_loads to a dictionary for easier access
+    target_workloads = {worker_id: load for worker_id, load in optimized_worker_loads}
+    
+    # Track current assignments to ensure we don't exceed target workloads
+    current_workloads = {worker_id: 0 for worker_id in workers}
+    
+    # Create assignments mapping serial numbers to workers
+    worker_assignments = []  # List of (worker_id, serial_no) tuples
+    
+    # First, group calibration items by calibrator and due date for better assignment
+    grouped_items = {}
+    for item in calibration_items:
+        calibrator, serial_no, due_date, _ = item
+        key = (calibrator, due_date)
+        if key not in grouped_items:
+            grouped_items[key] = []
+        grouped_items[key].append(serial_no)
+    
+    # Assign items to workers based on target workloads
+    for (calibrator, due_date), serial_numbers in grouped_items.items():
+        # Find workers who still need more items to reach their target
+        available_workers = [w for w in workers if current_workloads[w] < target_workloads.get(w, 0)]
+        
+        if not available_workers:
+            # If all workers have reached their targets, distribute remaining items evenly
+            available_workers = workers
+        
+        # Sort workers by how far they are from their target (ascending)
+        available_workers.sort(key=lambda w: target_workloads.get(w, 0) - current_workloads[w], reverse=True)
+        
+        # Assign serial numbers to workers
+        for serial_no in serial_numbers:
+            # Get the worker who needs the most items to reach target
+            best_worker = available_workers[0]
+            
+            # Add assignment
+            worker_assignments.append((best_worker, serial_no))
+            
+            # Update current workload
+            current_workloads[best_worker] += 1
+            
+            # Re-sort workers if there are more items to assign
+            if len(serial_numbers) > 1:
+                available_workers.sort(key=lambda w: target_workloads.get(w, 0) - current_workloads[w], reverse=True)
+    
+    return worker_assignments
+
+
+def solve_min_cost_allocation(workers, calibration_items, current_workers,
+                              w1=2.7, w2=2.0, w3=2.3, min_workload=10, max_deviation=5):
+    """
+    Optimal allocation engine, modelling items -> workers as a min-cost flow:
+    1. Items are grouped by (calibrator, due date); flow[g][w] is how many items
+       of group g worker w holds. Moving one item of g from a to b costs
+       cost[g][b] - cost[g][a].
+    2. cost[g][w] uses the heuristic's location and deadline terms (w2, w3):
+       w2 if w does not cover the calibrator yet, w3 if w does not cover the due
+       date yet (-0.5 * w3 if it does), judged on the current assignment.
+    3. Load bounds are capacities: every worker ends within
+       [max(avg - max_deviation, min_workload), avg + max_deviation], and the
+       w1 term adds w1 * |load - avg| as a convex cost inside the bounds.
+
+    The solve warm-starts from current_workers (the `pic` of every item): it
+    first repairs bound violations along shortest move paths, then cancels
+    negative cycles until none is left. Re-solving after a small change only
+    touches the few workers involved.
+
+    Returns a dict with loads [(worker_id, load)], assignments
+    [(worker_id, serial_no)] in item order, moved (items whose worker changed),
+    cost, iterations and seconds
+    """
+    started = time.perf_counter()
+    workers = list(workers)
+    worker_count = len(workers)
+    if worker_count == 0:
+        return {"loads": [], "assignments": [], "moved": 0, "cost": 0.0, "iterations": 0, "seconds": 0.0}
+    worker_index = {worker: w for w, worker in enumerate(workers)}
+
+    # Group items by location and deadline, starting from the current assignment
+    group_index = {}
+    group_keys = []
+    flow = []
+    item_groups = []
+    for item, current in zip(calibration_items, current_workers):
+        calibrator, _, due_date, _ = item
+        key = (calibrator, due_date)
+        g = group_index.get(key)
+        if g is None:
+            g = len(group_keys)
+            group_index[key] = g
+            group_keys.append(key)
+            flow.append([0] * worker_count)
+        item_groups.append(g)
+        flow[g][worker_index[current]] += 1
+
+    loads = [0] * worker_count
+    held = [set() for _ in range(worker_count)]
+    for g, counts in enumerate(flow):
+        for w, count in enumerate(counts):
+            if count:
+                loads[w] += count
+                held[w].add(g)
+
+    # Location and deadline coverage of the warm start fixes the per-group costs
+    locations = [set() for _ in range(worker_count)]
+    deadlines = [set() for _ in range(worker_count)]
+    for w in range(worker_count):
+        for g in held[w]:
+            locations[w].add(group_keys[g][0])
+            deadlines[w].add(group_keys[g][1])
+    cost = [
+        [
+            w2 * (0 if calibrator in locations[w] else 1)
+            + w3 * (-0.5 if due_date in deadlines[w] else 1)
+            for w in range(worker_count)
+        ]
+        for calibrator, due_date in group_keys
+    ]
+
+    # Load bounds used as capacities
+    total = len(item_groups)
+    avg = total / worker_count
+    upper = math.ceil(avg) + max_deviation
+    lower = max(int(avg) - max_deviation, 0)
+    if total >= worker_count * min_workload:
+        lower = max(lower, min_workload)
+
+    def balance(load):
+        return w1 * abs(load - avg)
+
+    def add_cost(w):
+        return balance(loads[w] + 1) - balance(loads[w]) if loads[w] < upper else math.inf
+
+    def remove_cost(w):
+        return balance(loads[w] - 1) - balance(loads[w]) if loads[w] > lower else math.inf
+
+    # moves[a][b] = (delta, group): cheapest way to hand one item from a to b
+    def best_moves(a):
+        row = [None] * worker_count
+        for b in range(worker_count):
+            if b == a:
+                continue
+            best = None
+            for g in held[a]:
+                delta = cost[g][b] - cost[g][a]
+                if best is None or delta < best[0]:
+                    best = (delta, g)
+            row[b] = best
+        return row
+
+    moves = [best_moves(a) for a in range(worker_count)]
+
+    def push(path_edges, amount):
+        # path_edges: list of (from_worker, to_worker, group)
+        changed = set()
+        for a, b, g in path_edges:
+            flow[g][a] -= amount
+            flow[g][b] += amount
+            loads[a] -= amount
+            loads[b] += amount
+            if flow[g][a] == 0:
+                held[a].discard(g)
+            held[b].add(g)
+            changed.update((a, b))
+        for w in changed:
+            moves[w] = best_moves(w)
+
+    def edge_capacity(path_edges):
+        return min(flow[g][a] for a, _, g in path_edges)
+
+    iterations = 0
+
+    # Phase 1: bring workers inside the load bounds with the cheapest direct moves.
+    # Phase 2 then finds any cheaper multi-step rearrangement.
+    while True:
+        over = [w for w in range(worker_count) if loads[w] > upper]
+        under = [w for w in range(worker_count) if loads[w] < lower]
+        if over:
+            a = over[0]
+            candidates = [(moves[a][b][0], b) for b in range(worker_count)
+                          if moves[a][b] is not None and loads[b] < upper]
+            if not candidates:
+                break
+            _, b = min(candidates)
+            amount = min(loads[a] - upper, upper - loads[b])
+        elif under:
+            b = under[0]
+            candidates = [(moves[a][b][0], a) for a in range(worker_count)
+                          if moves[a][b] is not None and loads[a] > lower]
+            if not candidates:
+                break
+            _, a = min(candidates)
+            amount = min(lower - loads[b], loads[a] - lower)
+        else:
+            break
+        g = moves[a][b][1]
+        push([(a, b, g)], min(amount, flow[g][a]))
+        iterations += 1
+
+    # Phase 2: cancel negative cycles; node `sink` closes paths that change loads
+    sink = worker_count
+    max_iterations = 100000
+    while iterations < max_iterations:
+        node_count = worker_count + 1
+        dist = [0.0] * node_count
+        previous = [None] * node_count
+        last_updated = None
+        for _ in range(node_count):
+            last_updated = None
+            for a in range(worker_count):
+                for b, move in enumerate(moves[a]):
+                    if move is not None and dist[a] + move[0] < dist[b] - EPSILON:
+                        dist[b] = dist[a] + move[0]
+                        previous[b] = (a, move[1])
+                        last_updated = b
+                # a's load can grow by one (closing a path into a)
+                increase = add_cost(a)
+                if dist[a] + increase < dist[sink] - EPSILON:
+                    dist[sink] = dist[a] + increase
+                    previous[sink] = (a, None)
+                    last_updated = sink
+            for b in range(worker_count):
+                # b's load can shrink by one (opening a path out of b)
+                decrease = remove_cost(b)
+                if dist[sink] + decrease < dist[b] - EPSILON:
+                    dist[b] = dist[sink] + decrease
+                    previous[b] = (sink, None)
+                    last_updated = b
+            if last_updated is None:
+                break
+
+        if last_updated is None:
+            break
+
+        # Walk back node_count steps to land on the negative cycle, then collect it
+        node = last_updated
+        for _ in range(node_count):
+            node = previous[node][0]
+        cycle = []
+        current = node
+        while True:
+            a, g = previous[current]
+            cycle.append((a, current, g))
+            current = a
+            if current == node:
+                break
+        cycle.reverse()
+
+        path_edges = [(a, b, g) for a, b, g in cycle if g is not None]
+        changes_loads = len(path_edges) < len(cycle)
+        amount = 1 if changes_loads else edge_capacity(path_edges)
+        push(path_edges, amount)
+        iterations += 1
+
+    # Turn group counts back into item assignments, keeping items where they are when possible
+    new_workers = list(current_workers)
+    members = {}
+    for i, g in enumerate(item_groups):
+        members.setdefault(g, []).append(i)
+    moved = 0
+    for g, items in members.items():
+        remaining = list(flow[g])
+        surplus = []
+        for i in items:
+            w = worker_index[current_workers[i]]
+            if remaining[w] > 0:
+                remaining[w] -= 1
+            else:
+                surplus.append(i)
+        for w in range(worker_count):
+            while remaining[w] > 0 and surplus:
+                new_workers[surplus.pop()] = workers[w]
+                remaining[w] -= 1
+                moved += 1
+
+    total_cost = sum(balance(load) for load in loads)
+    for g, counts in enumerate(flow):
+        total_cost += sum(count * cost[g][w] for w, count in enumerate(counts) if count)
+
+    return {
+        "loads": [(worker, loads[w]) for w, worker in enumerate(workers)],
+        "assignments": [(worker, item[1]) for worker, item in zip(new_workers, calibration_items)],
+        "moved": moved,
+        "cost": round(total_cost, 4),
+        "iterations": iterations,
+        "seconds": round(time.perf_counter() - started, 4)
+    }
+
+
+def allocation_score(workers, calibration_items, assigned_workers, w1=2.7, w2=2.0, w3=2.3):
+    """
+    Penalty of a complete assignment, the item-level version of the heuristic's
+    scoring (lower is better):
+    - w1 * sum over workers of |load - average load|
+    - w2 * number of distinct (worker, calibrator) pairs
+    - w3 * (1.5 * distinct (worker, due date) pairs - 0.5 * items), i.e. +1 for
+      the first item of a due date on a worker and -0.5 for every further one
+    """
+    search = _LocalSearchState(workers, calibration_items, assigned_workers, w1, w2, w3)
+    return search.score()
+
+
+class _LocalSearchState:
+    # Counters behind allocation_score, kept up to date so that the score change
+    # of a move or swap is computed in O(1)
+    def __init__(self, workers, calibration_items, assigned_workers, w1, w2, w3):
+        self.workers = list(workers)
+        self.w1, self.w2, self.w3 = w1, w2, w3
+        worker_index = {worker: w for w, worker in enumerate(self.workers)}
+        self.item_locations = [item[0] for item in calibration_items]
+        self.item_deadlines = [item[2] for item in calibration_items]
+        self.assigned = [worker_index[worker] for worker in assigned_workers]
+        self.loads = [0] * len(self.workers)
+        self.location_counts = [{} for _ in self.workers]
+        self.deadline_counts = [{} for _ in self.workers]
+        for i, w in enumerate(self.assigned):
+            self._add(i, w)
+        self.avg = len(self.assigned) / max(len(self.workers), 1)
+
+    def _add(self, i, w):
+        self.loads[w] += 1
+        location_counts = self.location_counts[w]
+        location_counts[self.item_locations[i]] = location_counts.get(self.item_locations[i], 0) + 1
+        deadline_counts = self.deadline_counts[w]
+        deadline_counts[self.item_deadlines[i]] = deadline_counts.get(self.item_deadlines[i], 0) + 1
+
+    def _remove(self, i, w):
+        self.loads[w] -= 1
+        location_counts = self.location_counts[w]
+        location_counts[self.item_locations[i]] -= 1
+        if not location_counts[self.item_locations[i]]:
+            del location_counts[self.item_locations[i]]
+        deadline_counts = self.deadline_counts[w]
+        deadline_counts[self.item_deadlines[i]] -= 1
+        if not deadline_counts[self.item_deadlines[i]]:
+            del deadline_counts[self.item_deadlines[i]]
+
+    def score(self):
+        balance = sum(abs(load - self.avg) for load in self.loads)
+        location_pairs = sum(len(counts) for counts in self.location_counts)
+        deadline_pairs = sum(len(counts) for counts in self.deadline_counts)
+        return (self.w1 * balance + self.w2 * location_pairs
+                + self.w3 * (1.5 * deadline_pairs - 0.5 * len(self.assigned)))
+
+    def _balance_delta(self, w, change):
+        return abs(self.loads[w] + change - self.avg) - abs(self.loads[w] - self.avg)
+
+    @staticmethod
+    def _pair_delta(counts_from, counts_to, key):
+        # Distinct-pair change when one item with `key` leaves counts_from for counts_to
+        return (-1 if counts_from[key] == 1 else 0) + (1 if key not in counts_to else 0)
+
+    def move_delta(self, i, b):
+        a = self.assigned[i]
+        location = self.item_locations[i]
+        deadline = self.item_deadlines[i]
+        return (self.w1 * (self._balance_delta(a, -1) + self._balance_delta(b, 1))
+                + self.w2 * self._pair_delta(self.location_counts[a], self.location_counts[b], location)
+                + self.w3 * 1.5 * self._pair_delta(self.deadline_counts[a], self.deadline_counts[b], deadline))
+
+    def swap_delta(self, i, j):
+        # Loads do not change; only pairs whose keys differ can change
+        a, b = self.assigned[i], self.assigned[j]
+        delta = 0.0
+        for weight, keys, counts in (
+            (self.w2, self.item_locations, self.location_counts),
+            (self.w3 * 1.5, self.item_deadlines, self.deadline_counts),
+        ):
+            key_i, key_j = keys[i], keys[j]
+            if key_i == key_j:
+                continue
+            counts_a, counts_b = counts[a], counts[b]
+            pairs = ((-1 if counts_a[key_i] == 1 else 0) + (1 if key_j not in counts_a else 0)
+                     + (-1 if counts_b[key_j] == 1 else 0) + (1 if key_i not in counts_b else 0))
+            delta += weight * pairs
+        return delta
+
+    def move(self, i, b):
+        self._remove(i, self.assigned[i])
+        self._add(i, b)
+        self.assigned[i] = b
+
+    def swap(self, i, j):
+        a, b = self.assigned[i], self.assigned[j]
+        self.move(i, b)
+        self.move(j, a)
+
+
+def improve_allocation(workers, calibration_items, assigned_workers, time_budget_ms,
+                       w1=2.7, w2=2.0, w3=2.3, seed=0):
+    """
+    Anytime local search on a complete assignment (e.g. the heuristic's picks).
+    Repeatedly tries a random move (one item to another worker) or swap (two
+    items between workers), scoring each with an O(1) delta of
+    allocation_score, and keeps it when the score does not get worse. Stops
+    when time_budget_ms has elapsed.
+
+    Returns a dict with assignments [(worker_id, serial_no)], loads
+    [(worker_id, load)], initial_score, score, iterations, accepted and
+    trajectory [(elapsed_ms, score)] recorded at each improvement
+    """
+    started = time.perf_counter()
+    deadline = started + time_budget_ms / 1000.0
+    search = _LocalSearchState(workers, calibration_items, assigned_workers, w1, w2, w3)
+    worker_count = len(search.workers)
+    item_count = len(search.assigned)
+    rng = random.Random(seed)
+
+    score = search.score()
+    initial_score = score
+    trajectory = [(0.0, round(score, 4))]
+    iterations = 0
+    accepted = 0
+
+    if worker_count > 1 and item_count > 1:
+        while True:
+            # Checking the clock is comparatively slow, so do it every 256 steps
+            if iterations % 256 == 0 and time.perf_counter() >= deadline:
+                break
+            iterations += 1
+
+            i = rng.randrange(item_count)
+            if rng.random() < 0.5:
+                b = rng.randrange(worker_count)
+                if b == search.assigned[i]:
+                    continue
+                delta = search.move_delta(i, b)
+                if delta <= 0:
+                    search.move(i, b)
+                else:
+                    continue
+            else:
+                j = rng.randrange(item_count)
+                if search.assigned[i] == search.assigned[j]:
+                    continue
+                delta = search.swap_delta(i, j)
+                if delta <= 0:
+                    search.swap(i, j)
+                else:
+                    continue
+
+            # Sideways steps (delta == 0) help cross plateaus without losing ground
+            accepted += 1
+            if delta < -EPSILON:
+                score += delta
+                elapsed_ms = (time.perf_counter() - started) * 1000
+                trajectory.append((round(elapsed_ms, 2), round(score, 4)))
+
+    # Thin the trajectory so responses stay small on long runs
+    if len(trajectory) > 200:
+        step = len(trajectory) / 199
+        trajectory = [trajectory[int(k * step)] for k in range(199)] + [trajectory[-1]]
+
+    workers = search.workers
+    return {
+        "assignments": [(workers[w], item[1]) for w, item in zip(search.assigned, calibration_items)],
+        "loads": [(worker, search.loads[w]) for w, worker in enumerate(workers)],
+        "initial_score": round(initial_score, 4),
+        "score": round(search.score(), 4),
+        "iterations": iterations,
+        "accepted": accepted,
+        "trajectory": trajectory,
+        "seconds": round(time.perf_counter() - started, 4)
+    }
+
+
+# Parameters of apply_heuristic_model that a sweep can vary, with their defaults
+SWEEP_PARAMETERS = {
+    'w1': 2.7,
+    'w2': 2.0,
+    'w3': 2.3,
+    'min_workload': 10,
+    'max_deviation': 5,
+}
+
+# Snapshot shared with sweep worker processes, set once per process by the pool initializer
+_sweep_snapshot = None
+
+
+def _init_sweep_worker(workers, calibration_items):
+    global _sweep_snapshot
+    _sweep_snapshot = (workers, calibration_items)
+
+
+def evaluate_heuristic_weights(config):
+    """
+    Run the heuristic with one weight configuration on the shared snapshot and
+    measure the trade-offs the planners care about (all lower is better):
+    - imbalance: sum over workers of |load - average load|
+    - location_pairs: distinct (worker, calibrator) pairs
+    - deadline_pairs: distinct (worker, due date) pairs
+    """
+    workers, calibration_items = _sweep_snapshot
+    loads = apply_heuristic_model(workers, calibration_items, verbose=False, **config)
+    # The mapping re-sorts the worker list in place; keep the shared snapshot untouched
+    assignments = assign_items_to_target_loads(list(workers), calibration_items, loads)
+
+    avg = len(calibration_items) / max(len(workers), 1)
+    item_keys = {item[1]: (item[0], item[2]) for item in calibration_items}
+    location_pairs = set()
+    deadline_pairs = set()
+    for worker, serial_no in assignments:
+        calibrator, due_date = item_keys[serial_no]
+        location_pairs.add((worker, calibrator))
+        deadline_pairs.add((worker, due_date))
+
+    return {
+        "config": config,
+        "loads": loads,
+        "imbalance": round(sum(abs(load - avg) for _, load in loads), 4),
+        "location_pairs": len(location_pairs),
+        "deadline_pairs": len(deadline_pairs)
+    }
+
+
+def pareto_front(results, objectives=('imbalance', 'location_pairs', 'deadline_pairs')):
+    # Results not dominated by any other result (no worse in every objective, better in one)
+    front = []
+    for result in results:
+        dominated = False
+        for other in results:
+            if other is result:
+                continue
+            if (all(other[key] <= result[key] for key in objectives)
+                    and any(other[key] < result[key] for key in objectives)):
+                dominated = True
+                break
+        if not dominated:
+            front.append(result)
+    return sorted(front, key=lambda result: tuple(result[key] for key in objectives))
+
+
+def sweep_heuristic_weights(workers, calibration_items, grid, max_workers=None):
+    """
+    Evaluate every combination of the values in grid (a dict of SWEEP_PARAMETERS
+    name -> list of values; missing names keep their default) in parallel on a
+    process pool. The snapshot is sent to each worker process once, through the
+    pool initializer, rather than with every configuration.
+
+    Returns (results, pareto_front)
+    """
+    names = list(SWEEP_PARAMETERS)
+    axes = [grid.get(name) or [SWEEP_PARAMETERS[name]] for name in names]
+    configs = [dict(zip(names, values)) for values in itertools.product(*axes)]
+
+    # spawn: the web server process has threads running, which fork does not handle safely
+    context = multiprocessing.get_context('spawn')
+    max_workers = min(max_workers or os.cpu_count() or 1, len(configs))
+    with ProcessPoolExecutor(
+        max_workers=max_workers,
+        mp_context=context,
+        initializer=_init_sweep_worker,
+        initargs=(workers, calibration_items),
+    ) as pool:
+        chunksize = max(1, len(configs) // (max_workers * 4))
+        results = list(pool.map(evaluate_heuristic_weights, configs, chunksize=chunksize))
+
+    return results, pareto_front(results)
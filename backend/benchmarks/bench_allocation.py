@@ -0,0 +1,106 @@
+"""
+Compare the heuristic, heuristic + local search and optimal (min-cost flow)
+allocation engines on synthetic fleets: run time, load spread, location/deadline
+grouping, penalty score, and how fast the optimal engine re-solves after a
+small change (warm start).
+
+Usage (from the backend folder):
+    python benchmarks/bench_allocation.py --items 2000 5000 --workers 20
+"""
+import argparse
+import contextlib
+import io
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from allocation import (
+    allocation_score,
+    apply_heuristic_model,
+    assign_items_to_target_loads,
+    improve_allocation,
+    solve_min_cost_allocation,
+)
+
+CALIBRATORS = ['OrchidCal', 'Key Solutions', 'HYDROTECHNIK', 'Opus Precision', 'CM Specialist']
+
+
+def synthetic_fleet(item_count, worker_count, seed=0):
+    # Skewed current assignment, like the real data where one pic holds most tools
+    rng = random.Random(seed)
+    workers = [f"W{w:03d}" for w in range(worker_count)]
+    weights = [1.0 / (w + 1) for w in range(worker_count)]
+    due_dates = [f"{day}-{month}-{year}" for year in ('25', '26', '27')
+                 for month in ('Jan', 'Apr', 'Jul', 'Oct') for day in (1, 15)]
+    items = []
+    current = []
+    for i in range(item_count):
+        items.append((rng.choice(CALIBRATORS), f"SN{i:07d}", rng.choice(due_dates), 0))
+        current.append(rng.choices(workers, weights)[0])
+    return workers, items, current
+
+
+def describe(workers, items, assignments):
+    loads = {worker: 0 for worker in workers}
+    locations = set()
+    deadlines = set()
+    due_by_serial = {serial: (calibrator, due) for calibrator, serial, due, _ in items}
+    for worker, serial in assignments:
+        loads[worker] += 1
+        calibrator, due = due_by_serial[serial]
+        locations.add((worker, calibrator))
+        deadlines.add((worker, due))
+    spread = max(loads.values()) - min(loads.values())
+    return spread, len(locations), len(deadlines)
+
+
+def quietly(func, *args, **kwargs):
+    # The heuristic prints its rebalancing steps
+    with contextlib.redirect_stdout(io.StringIO()):
+        return func(*args, **kwargs)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--items', type=int, nargs='+', default=[1000, 5000])
+    parser.add_argument('--workers', type=int, default=20)
+    parser.add_argument('--changes', type=int, default=20, help="items reassigned before the warm re-solve")
+    parser.add_argument('--time-budget-ms', type=int, default=200, help="local search budget")
+    args = parser.parse_args()
+
+    print(f"{'items':>7} {'engine':<10} {'seconds':>8} {'spread':>7} {'loc pairs':>10} {'due pairs':>10} {'moved':>7} {'score':>10}")
+
+    def report(item_count, engine, seconds, workers, items, current, assignments):
+        spread, location_pairs, deadline_pairs = describe(workers, items, assignments)
+        moved = sum(1 for (worker, _), old in zip(assignments, current) if worker != old)
+        score = allocation_score(workers, items, [worker for worker, _ in assignments])
+        print(f"{item_count:>7} {engine:<10} {seconds:>8.3f} {spread:>7} {location_pairs:>10} {deadline_pairs:>10} {moved:>7} {score:>10.1f}")
+
+    for item_count in args.items:
+        workers, items, current = synthetic_fleet(item_count, args.workers)
+
+        started = time.perf_counter()
+        loads = quietly(apply_heuristic_model, workers, items)
+        assignments = assign_items_to_target_loads(workers, items, loads)
+        heuristic_seconds = time.perf_counter() - started
+        report(item_count, 'heuristic', heuristic_seconds, workers, items, current, assignments)
+
+        improved = improve_allocation(workers, items, [worker for worker, _ in assignments], args.time_budget_ms)
+        report(item_count, '+ local', heuristic_seconds + improved["seconds"], workers, items, current, improved["assignments"])
+
+        solution = solve_min_cost_allocation(workers, items, current)
+        report(item_count, 'optimal', solution["seconds"], workers, items, current, solution["assignments"])
+
+        # Warm start: reassign a few items at random and solve again from the optimum
+        rng = random.Random(1)
+        warm = [worker for worker, _ in solution["assignments"]]
+        for i in rng.sample(range(item_count), min(args.changes, item_count)):
+            warm[i] = rng.choice(workers)
+        resolved = solve_min_cost_allocation(workers, items, warm)
+        report(item_count, 're-solve', resolved["seconds"], workers, items, warm, resolved["assignments"])
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,103 @@
+"""
+Compare the CSV and Parquet bulk import / export paths on a synthetic fleet.
+
+Usage (from the backend folder):
+    python benchmarks/bench_bulk_io.py --rows 1000000
+"""
+import argparse
+import os
+import sqlite3
+import sys
+import tempfile
+import time
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import bulk_io
+
+
+def synthetic_equipment(rows, seed=0):
+    # Rows shaped like the Bosch dataset, with dates in the database format
+    rng = np.random.default_rng(seed)
+    last = pd.Timestamp('2023-01-01') + pd.to_timedelta(rng.integers(0, 730, rows), unit='D')
+    interval = rng.choice([1, 2], rows)
+    due = last + pd.to_timedelta(interval * 365, unit='D')
+    return pd.DataFrame({
+        'div': rng.choice(['FA', 'HY', 'LOG'], rows),
+        'description': rng.choice(['Blade Micrometer', 'Dial Comparator', 'Torque Wrench', 'Pressure Gauge'], rows),
+        'brand': rng.choice(['Mitutoyo', 'MAHR', 'AIKOH', 'Hengliang'], rows),
+        'tag': None,
+        'model_no': [f"M-{n}" for n in rng.integers(100, 999, rows)],
+        'serial_no': [f"SN{n:08d}" for n in range(rows)],
+        'range': rng.choice(['0-25mm', '25-50mm', '0 - 0.1mm'], rows),
+        'tolerence_limit_external': None,
+        'tolerence_limit_internal': None,
+        'in_use': rng.choice(['Y', 'N'], rows),
+        'actual_calibration_interval': interval,
+        'last__calibration': last.strftime('%d-%b-%y'),
+        'calibration__due': due.strftime('%d-%b-%y'),
+        'remaining_mths_before_calibration_due_date': np.nan,
+        'external_cal': rng.choice(['Lab', 'In-House'], rows),
+        'calibration_report_number': [f"DL-{n}" for n in range(rows)],
+        'calibrator': rng.choice(['OrchidCal', 'Key Solutions', 'HYDROTECHNIK', 'Opus Precision'], rows),
+        'pic': rng.choice(['JS', 'RK', 'RC', 'Tay', 'M.H.'], rows),
+        'action_for_renewal_reminder': np.nan,
+    })
+
+
+def timed(label, results, func):
+    started = time.perf_counter()
+    value = func()
+    results.append((label, time.perf_counter() - started))
+    return value
+
+
+def export_to_file(conn, file_format, path, batch_rows):
+    with open(path, 'wb') as handle:
+        for chunk in bulk_io.iter_export_chunks(conn, 'bosch_equipment', file_format, batch_rows):
+            handle.write(chunk)
+    return os.path.getsize(path)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--rows', type=int, default=200000)
+    parser.add_argument('--batch-rows', type=int, default=bulk_io.DEFAULT_BATCH_ROWS)
+    args = parser.parse_args()
+
+    formats = ['csv'] + (['parquet'] if bulk_io.PARQUET_AVAILABLE else [])
+    if not bulk_io.PARQUET_AVAILABLE:
+        print("pyarrow is not installed, only the CSV path is benchmarked")
+
+    with tempfile.TemporaryDirectory() as workdir:
+        source = sqlite3.connect(os.path.join(workdir, 'source.db'))
+        synthetic_equipment(args.rows).to_sql('bosch_equipment', source, index=True)
+        source.commit()
+
+        results = []
+        sizes = {}
+        for file_format in formats:
+            path = os.path.join(workdir, bulk_io.export_filename('bosch_equipment', file_format))
+            sizes[file_format] = timed(
+                f"export {file_format}", results,
+                lambda: export_to_file(source, file_format, path, args.batch_rows)
+            )
+            target = sqlite3.connect(os.path.join(workdir, f'target_{file_format}.db'))
+            timed(
+                f"import {file_format}", results,
+                lambda: bulk_io.import_table(target, 'bosch_equipment', path, file_format, args.batch_rows)
+            )
+            target.close()
+        source.close()
+
+    print(f"\n{args.rows} rows, batches of {args.batch_rows}")
+    for label, seconds in results:
+        print(f"{label:<16} {seconds:8.2f}s  {args.rows / seconds:12,.0f} rows/s")
+    for file_format, size in sizes.items():
+        print(f"{file_format} file size: {size / 1e6:.1f} MB")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,108 @@
+"""
+Compare the shared date parser with the previous sequential strptime
+approach on a realistic mix of date formats.
+
+Usage (from the backend folder):
+    python benchmarks/bench_date_parsing.py --rows 200000
+"""
+import argparse
+import datetime
+import os
+import random
+import sys
+import time
+
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from date_parsing import _parse_date_text, parse_date, parse_date_series
+
+# Formats tried one after the other by the old convert_date_format, with the
+# dataset format in front as the old calendar parser did
+LEGACY_FORMATS = [
+    '%d-%b-%y',
+    '%d/%m/%Y',
+    '%d-%B-%Y',
+    '%d-%b-%Y',
+    '%Y-%m-%d',
+    '%m/%d/%Y',
+    '%d-%m-%Y',
+    '%d %B %Y',
+    '%d %b %Y',
+    '%d-%m-%y',
+]
+
+# Share of each format in the synthetic input: mostly the dataset format,
+# plus the numeric spreadsheet variant and what the frontend sends
+FORMAT_MIX = [
+    ('dataset', 0.70),
+    ('numeric', 0.15),
+    ('iso', 0.07),
+    ('slash', 0.05),
+    ('long', 0.03),
+]
+
+
+def legacy_parse(text):
+    for date_format in LEGACY_FORMATS:
+        try:
+            return datetime.datetime.strptime(text, date_format).date()
+        except ValueError:
+            continue
+    return None
+
+
+def render(date, style):
+    if style == 'dataset':
+        return f"{date.day}-{date.strftime('%b-%y')}"
+    if style == 'numeric':
+        return date.strftime('%d-%m-%y')
+    if style == 'iso':
+        return date.isoformat()
+    if style == 'slash':
+        return date.strftime('%d/%m/%Y')
+    return date.strftime('%d-%B-%Y')
+
+
+def synthetic_dates(rows, distinct_days=1500, seed=0):
+    # A few thousand distinct strings repeated across the fleet
+    rng = random.Random(seed)
+    start = datetime.date(2023, 1, 1)
+    styles = [style for style, _ in FORMAT_MIX]
+    weights = [weight for _, weight in FORMAT_MIX]
+    return [
+        render(start + datetime.timedelta(days=rng.randrange(distinct_days)), rng.choices(styles, weights)[0])
+        for _ in range(rows)
+    ]
+
+
+def timed(label, func):
+    started = time.perf_counter()
+    result = func()
+    print(f"{label:<28} {time.perf_counter() - started:8.3f}s")
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--rows', type=int, default=200000)
+    args = parser.parse_args()
+
+    values = synthetic_dates(args.rows)
+    print(f"{args.rows} values, {len(set(values))} distinct strings")
+
+    legacy = timed("sequential strptime", lambda: [legacy_parse(value) for value in values])
+    timed("regex detection, no cache", lambda: [_parse_date_text.__wrapped__(value) for value in values])
+    _parse_date_text.cache_clear()
+    cached = timed("parse_date (cold cache)", lambda: [parse_date(value) for value in values])
+    timed("parse_date (warm cache)", lambda: [parse_date(value) for value in values])
+    _parse_date_text.cache_clear()
+    series = timed("parse_date_series", lambda: parse_date_series(pd.Series(values)))
+
+    # The legacy order reads 06/07/2025 day first too, so all three must agree
+    print(f"matches strptime: {cached == legacy}")
+    print(f"series matches: {[value.date() for value in series] == legacy}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,104 @@
+"""
+Memory used by the allocation inputs with the compact encoding (integer
+codes, __slots__ records) compared with the previous Python strings in
+tuples, and by the low-cardinality inventory columns as pandas categoricals
+compared with object columns.
+
+Usage (from the backend folder):
+    python benchmarks/bench_encoding.py --rows 1000000
+"""
+import argparse
+import gc
+import os
+import pickle
+import sqlite3
+import sys
+import time
+import tracemalloc
+
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from encoding import encode_allocation_snapshot
+from bench_bulk_io import synthetic_equipment
+
+ALLOCATION_QUERY = "SELECT serial_no, pic, calibrator, calibration__due FROM bosch_equipment"
+
+# Low-cardinality text columns of bosch_equipment: a handful of distinct
+# values repeated over every row
+CATEGORICAL_COLUMNS = ['div', 'brand', 'calibrator', 'pic', 'in_use', 'external_cal']
+
+
+def legacy_snapshot(conn):
+    # The previous load_allocation_snapshot: records of strings, then tuples
+    df = pd.read_sql_query(ALLOCATION_QUERY, conn).dropna(subset=["serial_no", "pic"])
+    workload_df = df.groupby("pic")["serial_no"].count().reset_index()
+    workload_df.rename(columns={"serial_no": "old_workload"}, inplace=True)
+    data = df.merge(workload_df, on="pic", how="left").to_dict(orient="records")
+    workers = list(set(item["pic"] for item in data))
+    calibration_items = [
+        (item["calibrator"], item["serial_no"], item["calibration__due"], item["old_workload"])
+        for item in data
+    ]
+    current_workers = [item["pic"] for item in data]
+    return workers, calibration_items, current_workers
+
+
+def encoded_snapshot(conn):
+    df = pd.read_sql_query(ALLOCATION_QUERY, conn).dropna(subset=["serial_no", "pic"])
+    snapshot = encode_allocation_snapshot(df)
+    return snapshot.workers, snapshot.items, snapshot.current_workers
+
+
+def retained(build, conn):
+    # Bytes still allocated once build() returns (what a cached snapshot costs),
+    # the peak while building, and the build time
+    gc.collect()
+    tracemalloc.start()
+    started = time.perf_counter()
+    result = build(conn)
+    seconds = time.perf_counter() - started
+    gc.collect()
+    current, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return result, current, peak, seconds
+
+
+def mb(size):
+    return f"{size / 1e6:8.1f} MB"
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--rows', type=int, default=1000000)
+    args = parser.parse_args()
+
+    conn = sqlite3.connect(':memory:')
+    fleet = synthetic_equipment(args.rows)
+    fleet.to_sql('bosch_equipment', conn, index=True)
+    del fleet
+    print(f"{args.rows} synthetic rows")
+
+    # Times include the tracemalloc overhead; compare them with each other only
+    print("\nAllocation snapshot       retained        peak    pickled   seconds")
+    sizes = {}
+    for label, build in [("tuples of strings", legacy_snapshot), ("encoded records", encoded_snapshot)]:
+        result, current, peak, seconds = retained(build, conn)
+        pickled = len(pickle.dumps(result[1], protocol=pickle.HIGHEST_PROTOCOL))
+        sizes[label] = current
+        print(f"{label:<20} {mb(current)} {mb(peak)} {mb(pickled)} {seconds:8.2f}")
+        del result
+    print(f"reduction: {1 - sizes['encoded records'] / sizes['tuples of strings']:.0%}")
+
+    # The inventory columns as read from SQLite (one string object per cell)
+    df = pd.read_sql_query(f"SELECT {', '.join(f'`{c}`' for c in CATEGORICAL_COLUMNS)} FROM bosch_equipment", conn)
+    as_objects = df.memory_usage(deep=True, index=False).sum()
+    as_categories = df.astype('category').memory_usage(deep=True, index=False).sum()
+    print(f"\nInventory columns ({', '.join(CATEGORICAL_COLUMNS)})")
+    print(f"object dtype         {mb(as_objects)}")
+    print(f"categorical          {mb(as_categories)}")
+    print(f"reduction: {1 - as_categories / as_objects:.0%}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,62 @@
+"""
+Time the vectorized calibration forecast on a synthetic fleet and check it
+against a straightforward per-tool loop on a sample.
+
+Usage (from the backend folder):
+    python benchmarks/bench_forecast.py --rows 1000000 --months 60
+"""
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from bench_bulk_io import synthetic_equipment
+from forecast import forecast_workload, interval_months, next_due_months
+
+
+def loop_forecast(df, start, months):
+    # Reference implementation: walk every tool's calibrations one by one
+    totals = [0] * months
+    interval = interval_months(df)
+    due = next_due_months(df, interval)
+    for tool_due, tool_interval in zip(due, interval):
+        if np.isnat(tool_due):
+            continue
+        offset = max(int((tool_due - start).astype(int)), 0)
+        while offset < months:
+            totals[offset] += 1
+            if tool_interval <= 0:
+                break
+            offset += int(tool_interval)
+    return totals
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--rows', type=int, default=1000000)
+    parser.add_argument('--months', type=int, default=60)
+    parser.add_argument('--check-rows', type=int, default=5000)
+    args = parser.parse_args()
+
+    start = np.datetime64('2025-01', 'M')
+    df = synthetic_equipment(args.rows)[
+        ['actual_calibration_interval', 'last__calibration', 'calibration__due', 'calibrator', 'pic', 'div']
+    ]
+
+    sample = df.head(args.check_rows)
+    expected = loop_forecast(sample, start, args.months)
+    actual = forecast_workload(sample, start, args.months)["total"]
+    print(f"matches per-tool loop on {len(sample)} tools: {expected == actual}")
+
+    started = time.perf_counter()
+    forecast = forecast_workload(df, start, args.months)
+    seconds = time.perf_counter() - started
+
+    print(f"{args.rows} tools, {args.months} months: {forecast['calibrations']} calibrations in {seconds:.3f}s")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,347 @@
+"""
+Replay a mix of dashboard traffic against the backend at increasing
+concurrency and dataset sizes, and report throughput and p50/p95/p99 latency
+per endpoint.
+
+By default the app runs in-process behind the Flask test client, on one
+synthetic database per --rows value (the databases are plants, selected with
+?plant=). With --url the requests go to a running server instead, on whatever
+data it serves; that includes the real HTTP stack and is not limited by this
+process's GIL.
+
+Save a run with --save and compare a later run against it with --compare to
+catch latency regressions before deploying (exits with status 1 when an
+endpoint's p95 grew by more than --tolerance).
+
+Usage (from the backend folder):
+    python benchmarks/load_test.py --rows 1000 20000 --concurrency 1 4 16
+    python benchmarks/load_test.py --mix inventory=1,allocation=1 --requests 100
+    python benchmarks/load_test.py --url http://localhost:5000 --save baseline.json
+"""
+import argparse
+import contextlib
+import io
+import json
+import os
+import random
+import sqlite3
+import sys
+import tempfile
+import threading
+import time
+import urllib.error
+import urllib.request
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from bench_bulk_io import synthetic_equipment
+
+# Share of each kind of call in the replayed traffic (see SCENARIOS)
+DEFAULT_MIX = 'inventory=40,calendar=25,update=15,reports=15,allocation=5'
+
+SEARCH_TERMS = ['blade', 'micrometer', 'torque', 'gauge', 'mitutoyo', 'dial']
+
+
+class TrafficState:
+    """
+    What the scenarios need to know about the dataset of one run: the tool
+    ids that exist and the malfunction reports created so far (shared by
+    the request threads)
+    """
+
+    def __init__(self, tool_count):
+        self.tool_count = tool_count
+        self.reports = []
+        self.lock = threading.Lock()
+
+    def add_report(self, report_id):
+        with self.lock:
+            self.reports.append(report_id)
+
+    def take_report(self, rng):
+        with self.lock:
+            if not self.reports:
+                return None
+            return self.reports.pop(rng.randrange(len(self.reports)))
+
+
+# Each scenario returns (label, method, path, json body) for one request;
+# the label groups the latencies in the report
+
+def inventory_call(rng, state):
+    choice = rng.random()
+    if choice < 0.5:
+        return 'GET /api/tools-inventory', 'GET', '/api/tools-inventory', None
+    if choice < 0.75:
+        months = rng.choice([1, 3, 6])
+        return ('GET /api/tools-inventory?due_within_months', 'GET',
+                f'/api/tools-inventory?due_within_months={months}&sort=due_date', None)
+    term = rng.choice(SEARCH_TERMS)
+    return 'GET /api/tools/search', 'GET', f'/api/tools/search?q={term}', None
+
+
+def calendar_call(rng, state):
+    if rng.random() < 0.7:
+        return 'GET /api/no1?get_data=true', 'GET', '/api/no1?get_data=true', None
+    return 'GET /api/calibration-forecast', 'GET', '/api/calibration-forecast?months=12', None
+
+
+def update_call(rng, state):
+    body = {
+        'id': rng.randrange(state.tool_count),
+        'status': rng.choice(['Y', 'N']),
+        'calibrator': rng.choice(['OrchidCal', 'Key Solutions', 'HYDROTECHNIK', 'Opus Precision'])
+    }
+    return 'POST /api/update-tool', 'POST', '/api/update-tool', body
+
+
+def reports_call(rng, state):
+    choice = rng.random()
+    if choice < 0.4:
+        return 'GET /api/malfunction-reports', 'GET', '/api/malfunction-reports', None
+    if choice < 0.7:
+        report_id = state.take_report(rng)
+        if report_id:
+            if choice < 0.55:
+                body = {'severity': rng.choice(['low', 'medium', 'high']), 'description': 'Updated by load test'}
+                state.add_report(report_id)
+                return 'PUT /api/malfunction-reports/<id>', 'PUT', f'/api/malfunction-reports/{report_id}', body
+            return 'DELETE /api/malfunction-reports/<id>', 'DELETE', f'/api/malfunction-reports/{report_id}', None
+    body = {
+        'toolId': str(uuid.uuid4()),
+        'toolName': 'Load test tool',
+        'serialNumber': 'LOADTEST',
+        'severity': rng.choice(['low', 'medium', 'high']),
+        'description': 'Reported by load test',
+        'reportedAt': time.strftime('%Y-%m-%dT%H:%M:%S')
+    }
+    return 'POST /api/malfunction-reports', 'POST', '/api/malfunction-reports', body
+
+
+def allocation_call(rng, state):
+    if rng.random() < 0.8:
+        return 'GET /api/optimize-worker-allocation', 'GET', '/api/optimize-worker-allocation', None
+    return ('GET /api/optimize-worker-allocation?engine=optimal', 'GET',
+            '/api/optimize-worker-allocation?engine=optimal', None)
+
+
+SCENARIOS = {
+    'inventory': inventory_call,
+    'calendar': calendar_call,
+    'update': update_call,
+    'reports': reports_call,
+    'allocation': allocation_call,
+}
+
+
+def parse_mix(text):
+    # "inventory=40,calendar=25" -> {'inventory': 40.0, 'calendar': 25.0}
+    mix = {}
+    for entry in text.split(','):
+        name, _, weight = entry.strip().partition('=')
+        if name not in SCENARIOS:
+            raise SystemExit(f"Unknown scenario '{name}', expected one of {list(SCENARIOS)}")
+        mix[name] = float(weight or 1)
+    return mix
+
+
+class TestClientTransport:
+    # In-process app; one test client per thread
+    def __init__(self, app, plant):
+        self.app = app
+        self.plant = plant
+        self.local = threading.local()
+
+    def send(self, method, path, body):
+        client = getattr(self.local, 'client', None)
+        if client is None:
+            client = self.local.client = self.app.test_client()
+        separator = '&' if '?' in path else '?'
+        response = client.open(f"{path}{separator}plant={self.plant}", method=method, json=body)
+        if response.status_code == 201 and path == '/api/malfunction-reports':
+            return response.status_code, response.get_json()
+        response.close()
+        return response.status_code, None
+
+
+class HttpTransport:
+    # A running server at base_url
+    def __init__(self, base_url, plant=None):
+        self.base_url = base_url.rstrip('/')
+        self.plant = plant
+
+    def send(self, method, path, body):
+        if self.plant:
+            path = f"{path}{'&' if '?' in path else '?'}plant={self.plant}"
+        data = json.dumps(body).encode() if body is not None else None
+        request = urllib.request.Request(f"{self.base_url}{path}", data=data, method=method)
+        if data is not None:
+            request.add_header('Content-Type', 'application/json')
+        try:
+            with urllib.request.urlopen(request) as response:
+                payload = response.read()
+                status = response.status
+        except urllib.error.HTTPError as e:
+            return e.code, None
+        if status == 201 and path.startswith('/api/malfunction-reports'):
+            return status, json.loads(payload)
+        return status, None
+
+
+def percentile(sorted_values, fraction):
+    # Nearest-rank percentile of an already sorted list
+    index = min(len(sorted_values) - 1, max(0, int(round(fraction * len(sorted_values))) - 1))
+    return sorted_values[index]
+
+
+def run_level(transport, state, mix, concurrency, request_count, seed):
+    """
+    Send request_count requests from concurrency threads.
+    Returns (wall seconds, {label: {"latencies": [...], "errors": n}})
+    """
+    names = list(mix)
+    weights = [mix[name] for name in names]
+    results = {}
+    results_lock = threading.Lock()
+    counter = iter(range(request_count))
+    counter_lock = threading.Lock()
+
+    def worker(thread_index):
+        rng = random.Random(seed * 1000 + thread_index)
+        while True:
+            with counter_lock:
+                if next(counter, None) is None:
+                    return
+            label, method, path, body = SCENARIOS[rng.choices(names, weights)[0]](rng, state)
+            started = time.perf_counter()
+            try:
+                status, payload = transport.send(method, path, body)
+            except Exception:
+                status, payload = None, None
+            elapsed = time.perf_counter() - started
+            if payload and payload.get('report_id'):
+                state.add_report(payload['report_id'])
+            with results_lock:
+                entry = results.setdefault(label, {"latencies": [], "errors": 0})
+                entry["latencies"].append(elapsed)
+                if status is None or status >= 400:
+                    entry["errors"] += 1
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        list(executor.map(worker, range(concurrency)))
+    return time.perf_counter() - started, results
+
+
+def summarize(wall_seconds, results):
+    summary = {}
+    for label, entry in sorted(results.items()):
+        latencies = sorted(entry["latencies"])
+        summary[label] = {
+            "requests": len(latencies),
+            "errors": entry["errors"],
+            "p50_ms": percentile(latencies, 0.50) * 1000,
+            "p95_ms": percentile(latencies, 0.95) * 1000,
+            "p99_ms": percentile(latencies, 0.99) * 1000
+        }
+    total = sum(len(entry["latencies"]) for entry in results.values())
+    return {"requests": total, "seconds": wall_seconds, "throughput": total / wall_seconds, "endpoints": summary}
+
+
+def print_level(dataset, concurrency, level):
+    print(f"\n{dataset}, concurrency {concurrency}: {level['requests']} requests in "
+          f"{level['seconds']:.2f}s, {level['throughput']:.1f} req/s")
+    print(f"  {'endpoint':<52} {'n':>5} {'err':>4} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9}")
+    for label, stats in level["endpoints"].items():
+        print(f"  {label:<52} {stats['requests']:>5} {stats['errors']:>4} "
+              f"{stats['p50_ms']:>9.1f} {stats['p95_ms']:>9.1f} {stats['p99_ms']:>9.1f}")
+
+
+def compare(baseline, report, tolerance):
+    # Endpoints whose p95 grew by more than tolerance (a fraction) since the baseline
+    regressions = []
+    for key, level in report.items():
+        for label, stats in level["endpoints"].items():
+            previous = baseline.get(key, {}).get("endpoints", {}).get(label)
+            if previous and stats["p95_ms"] > previous["p95_ms"] * (1 + tolerance):
+                regressions.append((key, label, previous["p95_ms"], stats["p95_ms"]))
+    return regressions
+
+
+def build_plants(workdir, row_counts):
+    # One synthetic database per dataset size, as BOSCH_PLANTS entries
+    plants = {}
+    for rows in row_counts:
+        path = os.path.join(workdir, f"rows{rows}.db")
+        conn = sqlite3.connect(path)
+        synthetic_equipment(rows).to_sql('bosch_equipment', conn, index=True)
+        conn.commit()
+        conn.close()
+        plants[f"rows{rows}"] = path
+    return plants
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--rows', type=int, nargs='+', default=[1000, 20000], help="synthetic dataset sizes")
+    parser.add_argument('--concurrency', type=int, nargs='+', default=[1, 4, 16])
+    parser.add_argument('--requests', type=int, default=300, help="requests per concurrency level")
+    parser.add_argument('--mix', default=DEFAULT_MIX, help="scenario weights, e.g. inventory=40,allocation=5")
+    parser.add_argument('--url', help="load a running server instead of the in-process app")
+    parser.add_argument('--plant', help="?plant= to send with --url")
+    parser.add_argument('--tools', type=int, default=1000, help="tool ids to update with --url")
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--save', help="write the results to this JSON file")
+    parser.add_argument('--compare', help="baseline JSON file from --save")
+    parser.add_argument('--tolerance', type=float, default=0.25, help="allowed p95 growth over the baseline")
+    args = parser.parse_args()
+
+    mix = parse_mix(args.mix)
+    report = {}
+
+    def run_dataset(dataset, transport, tool_count):
+        state = TrafficState(tool_count)
+        for concurrency in args.concurrency:
+            # The app logs every request; keep the report readable
+            with contextlib.redirect_stdout(io.StringIO()):
+                wall_seconds, results = run_level(
+                    transport, state, mix, concurrency, args.requests, args.seed
+                )
+            level = summarize(wall_seconds, results)
+            report[f"{dataset}/c{concurrency}"] = level
+            print_level(dataset, concurrency, level)
+
+    if args.url:
+        run_dataset(args.url, HttpTransport(args.url, args.plant), args.tools)
+    else:
+        with tempfile.TemporaryDirectory() as workdir:
+            plants = build_plants(workdir, args.rows)
+            # main reads the plant list when imported
+            os.environ['BOSCH_PLANTS'] = ','.join(f"{plant}={path}" for plant, path in plants.items())
+            with contextlib.redirect_stdout(io.StringIO()):
+                import main as backend
+                app = backend.create_app()
+            for rows in args.rows:
+                run_dataset(f"{rows} rows", TestClientTransport(app, f"rows{rows}"), rows)
+            for pool in list(backend.plant_pools.values()) + list(backend.plant_read_pools.values()):
+                pool.close_all()
+
+    if args.save:
+        with open(args.save, 'w') as handle:
+            json.dump(report, handle, indent=2)
+        print(f"\nSaved results to {args.save}")
+
+    if args.compare:
+        with open(args.compare) as handle:
+            baseline = json.load(handle)
+        regressions = compare(baseline, report, args.tolerance)
+        print(f"\n{len(regressions)} p95 regressions over {args.tolerance:.0%} against {args.compare}")
+        for key, label, before, after in regressions:
+            print(f"  {key} {label}: {before:.1f} ms -> {after:.1f} ms")
+        if regressions:
+            sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,301 @@
+import io
+import os
+
+import pandas as pd
+
+from date_parsing import DB_DATE_FORMAT, parse_date_series
+
+# pyarrow is optional: without it imports and exports fall back to CSV
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+    PARQUET_AVAILABLE = True
+except ImportError:
+    pa = None
+    pq = None
+    PARQUET_AVAILABLE = False
+
+# Tables that can be bulk imported / exported
+BULK_TABLES = ['bosch_equipment', 'malfunction_reports']
+
+# File formats of imports and exports
+FILE_FORMATS = ['parquet', 'csv']
+
+# Number of rows read or written per batch (one Parquet row group per batch)
+DEFAULT_BATCH_ROWS = 50000
+
+# Typed columns of bosch_equipment; everything else is kept as text
+DATE_COLUMNS = ['last__calibration', 'calibration__due']
+FLAG_COLUMNS = ['in_use']
+INTEGER_COLUMNS = ['actual_calibration_interval']
+
+# Generated by the database (see create_due_date_column), never exported or imported
+DERIVED_COLUMNS = ['calibration_due_date']
+
+
+def clean_column_names(df):
+    # Same normalisation create_and_load applies to the CSV headers
+    df.columns = df.columns.str.strip().str.lower().str.replace(' ', '_').str.replace('-', '_')
+    return df
+
+
+def _map_unique(series, convert):
+    # A fleet has far fewer distinct dates than rows, so convert each distinct value once
+    codes, uniques = pd.factorize(series)
+    converted = pd.Series(convert(uniques)).to_numpy()
+    result = pd.Series(converted.take(codes), index=series.index)
+    result[codes == -1] = None
+    return result
+
+
+def _format_dates(values):
+    # The dataset writes days without a leading zero (6-Dec-24)
+    return pd.Index(values.strftime(DB_DATE_FORMAT)).str.replace(r'^0', '', regex=True)
+
+
+def to_typed_frame(table_name, df):
+    """
+    Convert rows read from the database into typed columns for Parquet:
+    - dates (12-Oct-24) -> datetime64
+    - Y/N flags -> nullable boolean
+    - calibration interval -> nullable integer
+    """
+    if table_name != 'bosch_equipment':
+        return df
+
+    df = df.copy()
+    for column in DATE_COLUMNS:
+        if column in df.columns:
+            df[column] = parse_date_series(df[column])
+    for column in FLAG_COLUMNS:
+        if column in df.columns:
+            df[column] = df[column].map({'Y': True, 'N': False}).astype('boolean')
+    for column in INTEGER_COLUMNS:
+        if column in df.columns:
+            df[column] = pd.to_numeric(df[column], errors='coerce').astype('Int64')
+    return df
+
+
+def from_typed_frame(table_name, df):
+    # Inverse of to_typed_frame: back to the text formats the API and frontend use
+    if table_name != 'bosch_equipment':
+        return df
+
+    df = df.copy()
+    for column in DATE_COLUMNS:
+        if column in df.columns and pd.api.types.is_datetime64_any_dtype(df[column]):
+            df[column] = _map_unique(df[column], _format_dates)
+    for column in FLAG_COLUMNS:
+        if column in df.columns and pd.api.types.is_bool_dtype(df[column]):
+            df[column] = df[column].map({True: 'Y', False: 'N'})
+    return df
+
+
+def detect_format(filename, requested=None):
+    if requested:
+        file_format = requested.lower()
+        if file_format not in FILE_FORMATS:
+            raise ValueError(f"Unsupported format '{requested}', expected one of {FILE_FORMATS}")
+        return file_format
+    return 'parquet' if filename.lower().endswith(('.parquet', '.pq')) else 'csv'
+
+
+def iter_import_batches(path, file_format, batch_rows=DEFAULT_BATCH_ROWS):
+    """
+    Yield DataFrames of at most batch_rows rows from a Parquet or CSV file, so
+    memory stays bounded by the batch size rather than the file size.
+    """
+    if file_format == 'parquet':
+        if not PARQUET_AVAILABLE:
+            raise ValueError("Parquet import requires pyarrow, which is not installed")
+        parquet_file = pq.ParquetFile(path)
+        for batch in parquet_file.iter_batches(batch_size=batch_rows):
+            # Keep Y/N flags with missing values as booleans rather than objects
+            yield batch.to_pandas(types_mapper={pa.bool_(): pd.BooleanDtype()}.get)
+    else:
+        for chunk in pd.read_csv(path, chunksize=batch_rows):
+            yield chunk
+
+
+# Columns a bosch_equipment import must have: the routes query them directly
+REQUIRED_COLUMNS = {
+    'bosch_equipment': ['serial_no', 'pic', 'calibrator', 'calibration__due'],
+    'malfunction_reports': [],
+}
+
+
+def staging_table_name(table_name):
+    return f"{table_name}_staging"
+
+
+def _quote(name):
+    return '"{}"'.format(name.replace('"', '""'))
+
+
+def _insert_rows(conn, table_name, batch, verb='INSERT'):
+    batch = batch.astype(object).where(batch.notna(), None)
+    columns = ', '.join(_quote(column) for column in batch.columns)
+    placeholders = ', '.join('?' for _ in batch.columns)
+    conn.executemany(
+        f"{verb} INTO {_quote(table_name)} ({columns}) VALUES ({placeholders})",
+        batch.itertuples(index=False, name=None)
+    )
+
+
+def import_table(conn, table_name, path, file_format, batch_rows=DEFAULT_BATCH_ROWS, required_columns=()):
+    """
+    Load a Parquet or CSV file into table_name in batches, within the
+    caller's transaction: nothing is committed, so a failure part way leaves
+    the database as it was once the caller rolls back.
+    - bosch_equipment rows go into a fresh staging table, which the caller
+      swaps in with replace_with_staging (like create_and_load, the import
+      replaces the table)
+    - malfunction_reports rows are upserted so the table keeps its constraints;
+      columns the table does not have are rejected
+    Raises ValueError for files that do not fit the table, including files
+    without one of required_columns (on top of REQUIRED_COLUMNS).
+    Returns the number of rows imported.
+    """
+    if table_name not in BULK_TABLES:
+        raise ValueError(f"Unsupported table: {table_name}")
+
+    if table_name == 'bosch_equipment':
+        target = staging_table_name(table_name)
+        conn.execute(f"DROP TABLE IF EXISTS {_quote(target)}")
+    else:
+        target = table_name
+        known_columns = {column[1] for column in conn.execute(f"PRAGMA table_info({_quote(table_name)})")}
+
+    rows_imported = 0
+    columns = None
+    for batch in iter_import_batches(path, file_format, batch_rows):
+        batch = from_typed_frame(table_name, clean_column_names(batch))
+        batch = batch.drop(columns=DERIVED_COLUMNS, errors='ignore')
+
+        if columns is None:
+            columns = list(batch.columns)
+            required = list(dict.fromkeys([*REQUIRED_COLUMNS[table_name], *required_columns]))
+            missing = [column for column in required if column not in columns]
+            if missing:
+                raise ValueError(f"Missing columns for {table_name}: {missing}")
+        elif list(batch.columns) != columns:
+            raise ValueError(f"Rows after row {rows_imported} have different columns")
+
+        if table_name == 'bosch_equipment':
+            # Keep the "index" column continuous across batches
+            if 'index' in batch.columns:
+                batch = batch.set_index('index')
+            else:
+                batch.index = range(rows_imported, rows_imported + len(batch))
+            batch = batch.rename_axis('index').reset_index()
+            if rows_imported == 0:
+                # Same column types to_sql would pick
+                conn.execute(pd.io.sql.get_schema(batch, target, con=conn))
+            _insert_rows(conn, target, batch)
+        else:
+            unknown = [column for column in columns if column not in known_columns]
+            if unknown:
+                raise ValueError(f"Unknown columns for {table_name}: {unknown}")
+            _insert_rows(conn, target, batch, verb='INSERT OR REPLACE')
+
+        rows_imported += len(batch)
+
+    if rows_imported == 0:
+        raise ValueError("The file has no rows")
+    return rows_imported
+
+
+def replace_with_staging(conn, table_name):
+    """
+    Swap the staging table filled by import_table in for table_name, in the
+    caller's transaction. The old table's triggers, indexes and generated
+    columns go with it, so the caller recreates them before committing.
+    """
+    staging = staging_table_name(table_name)
+    duplicates = conn.execute(
+        f'SELECT COUNT(*) - COUNT(DISTINCT "index") FROM {_quote(staging)}'
+    ).fetchone()[0]
+    if duplicates:
+        raise ValueError(f"{duplicates} rows repeat an index value")
+
+    conn.execute(f"DROP TABLE IF EXISTS {_quote(table_name)}")
+    conn.execute(f"ALTER TABLE {_quote(staging)} RENAME TO {_quote(table_name)}")
+    # The index to_sql creates, used by the search index to find rows
+    conn.execute(f'CREATE INDEX IF NOT EXISTS "ix_{table_name}_index" ON {_quote(table_name)} ("index")')
+
+
+class _ChunkSink(io.RawIOBase):
+    # Write-only file object that hands the written bytes back in pieces,
+    # so a Parquet file can be streamed while it is being written
+    def __init__(self):
+        super().__init__()
+        self._chunks = []
+        self._position = 0
+
+    def writable(self):
+        return True
+
+    def write(self, data):
+        self._chunks.append(bytes(data))
+        self._position += len(data)
+        return len(data)
+
+    def tell(self):
+        return self._position
+
+    def drain(self):
+        data = b''.join(self._chunks)
+        self._chunks = []
+        return data
+
+
+def iter_export_chunks(conn, table_name, file_format, batch_rows=DEFAULT_BATCH_ROWS):
+    """
+    Stream table_name as Parquet (one row group per batch) or CSV, yielding bytes.
+    Only one batch of rows is held in memory at a time.
+    """
+    if table_name not in BULK_TABLES:
+        raise ValueError(f"Unsupported table: {table_name}")
+
+    batches = (
+        batch.drop(columns=DERIVED_COLUMNS, errors='ignore')
+        for batch in pd.read_sql_query(f"SELECT * FROM {table_name}", conn, chunksize=batch_rows)
+    )
+
+    if file_format == 'parquet':
+        sink = _ChunkSink()
+        writer = None
+        schema = None
+        for batch in batches:
+            typed = to_typed_frame(table_name, batch)
+            if writer is None:
+                # Columns that are entirely empty in the first batch are text columns
+                schema = pa.Schema.from_pandas(typed, preserve_index=False)
+                schema = pa.schema([
+                    field.with_type(pa.string()) if pa.types.is_null(field.type) else field
+                    for field in schema
+                ])
+                writer = pq.ParquetWriter(sink, schema, compression='snappy')
+            table = pa.Table.from_pandas(typed, schema=schema, preserve_index=False)
+            writer.write_table(table, row_group_size=batch_rows)
+            yield sink.drain()
+        if writer is not None:
+            writer.close()
+            yield sink.drain()
+    else:
+        header = True
+        for batch in batches:
+            yield batch.to_csv(index=False, header=header).encode('utf-8')
+            header = False
+
+
+def export_filename(table_name, file_format):
+    extension = 'parquet' if file_format == 'parquet' else 'csv'
+    return f"{table_name}.{extension}"
+
+
+def remove_quietly(path):
+    try:
+        os.remove(path)
+    except OSError:
+        pass
@@ -0,0 +1,124 @@
+import datetime
+import functools
+import re
+
+# Format stored in the database (e.g. 12-Oct-24)
+DB_DATE_FORMAT = '%d-%b-%y'
+
+# Distinct date strings remembered by parse_date; a fleet has a few thousand
+DATE_CACHE_SIZE = 16384
+
+# Day, month (number or name) and year separated by the same '-', '/' or ' ':
+# 12-Oct-24, 28-11-25, 06/06/2025, 06-June-2025, 06 Jun 2025
+_DAY_FIRST = re.compile(r'(\d{1,2})([-/ ])([A-Za-z]{3,9}|\d{1,2})\2(\d{4}|\d{2})')
+# ISO dates, optionally followed by a time: 2025-06-06, 2025-06-06T08:00:00
+_YEAR_FIRST = re.compile(r'(\d{4})-(\d{1,2})-(\d{1,2})(?:[T ].*)?')
+
+_MONTHS = {
+    name: number
+    for number, name in enumerate(
+        ['january', 'february', 'march', 'april', 'may', 'june', 'july',
+         'august', 'september', 'october', 'november', 'december'],
+        start=1
+    )
+}
+
+
+def _month_number(text):
+    if text.isdigit():
+        return int(text)
+    # Abbreviation (Oct) or full name (October), any case
+    text = text.lower()
+    for name, number in _MONTHS.items():
+        if name.startswith(text) and (len(text) == 3 or text == name):
+            return number
+    return None
+
+
+def _full_year(text):
+    year = int(text)
+    if len(text) == 2:
+        # Same pivot as strptime's %y: 00-68 -> 2000s, 69-99 -> 1900s
+        year += 2000 if year < 69 else 1900
+    return year
+
+
+def _make_date(year, month, day):
+    try:
+        return datetime.date(year, month, day)
+    except (TypeError, ValueError):
+        return None
+
+
+def parse_date(text):
+    """
+    Parse a date in any of the formats found in the dataset and the frontend
+    into a datetime.date, or None when it is not a date. The format is
+    picked with one regex match instead of trying strptime formats in turn:
+    - 12-Oct-24, 6-Dec-24, 28-11-25 (day-month-year, 2 or 4 digit year)
+    - 06-June-2025, 06 Jun 2025
+    - 06/06/2025 (day first; month first when the day-first reading is invalid)
+    - 2025-06-06, 2025-06-06T08:00:00
+    """
+    # Checked before the cache, which cannot hash e.g. a dict from a JSON body
+    if not isinstance(text, str):
+        return None
+    return _parse_date_text(text)
+
+
+@functools.lru_cache(maxsize=DATE_CACHE_SIZE)
+def _parse_date_text(text):
+    text = text.strip()
+
+    match = _DAY_FIRST.fullmatch(text)
+    if match:
+        day, separator, month, year = match.groups()
+        month_number = _month_number(month)
+        parsed = _make_date(_full_year(year), month_number, int(day))
+        if parsed is None and separator == '/' and month.isdigit():
+            # US style 12/31/2025
+            parsed = _make_date(_full_year(year), int(day), int(month))
+        return parsed
+
+    match = _YEAR_FIRST.fullmatch(text)
+    if match:
+        year, month, day = match.groups()
+        return _make_date(int(year), int(month), int(day))
+
+    return None
+
+
+def to_db_format(text):
+    """
+    Convert a date in any supported format to the database format (DD-MMM-YY).
+    Text that is not a recognisable date is returned unchanged.
+    """
+    parsed = parse_date(text)
+    return parsed.strftime(DB_DATE_FORMAT) if parsed else text
+
+
+def parse_date_series(series):
+    """
+    Batch version of parse_date for a pandas Series: each distinct value is
+    parsed once and the results are spread back with NumPy indexing.
+    Returns a datetime64 Series (NaT where a value is missing or not a date).
+    """
+    import pandas as pd
+
+    codes, uniques = pd.factorize(series)
+    if len(uniques) == 0:
+        return pd.Series(pd.NaT, index=series.index, dtype='datetime64[ns]')
+    parsed = pd.to_datetime(pd.Series([parse_date(value) for value in uniques], dtype=object))
+    dates = parsed.to_numpy().take(codes)
+    dates[codes == -1] = None
+    return pd.Series(dates, index=series.index)
+
+
+def cache_stats():
+    info = _parse_date_text.cache_info()
+    return {
+        "hits": info.hits,
+        "misses": info.misses,
+        "size": info.currsize,
+        "max_size": info.maxsize
+    }
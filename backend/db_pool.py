@@ -0,0 +1,203 @@
+import os
+import queue
+import sqlite3
+import tempfile
+import threading
+import time
+from urllib.parse import quote
+
+
+class PooledConnection(sqlite3.Connection):
+    """
+    sqlite3 connection that goes back to its pool on close() instead of
+    closing, so routes keep their usual connect / try / finally close pattern.
+    """
+
+    _pool = None
+    _checked_out = False
+    # Identifies the current checkout; a new one on every connect()
+    _checkout = None
+
+    def close(self, checkout=None):
+        if self._pool is None:
+            super().close()
+        elif self._checked_out and checkout in (None, self._checkout):
+            # A second close() from the same caller must not return it twice
+            self._checked_out = False
+            self._pool.release(self)
+
+    def closer(self):
+        """
+        close() bound to the current checkout, for callbacks that may run
+        after the connection was released and checked out by someone else
+        (e.g. Response.call_on_close): once stale, it does nothing
+        """
+        checkout = self._checkout
+        return lambda: self.close(checkout)
+
+    def discard(self):
+        # Really close, for connections the pool no longer keeps
+        self._pool = None
+        super().close()
+
+
+def read_only_uri(path):
+    # URI that opens path read-only; with WAL, readers never block the writer
+    return f"file:{quote(os.path.abspath(path))}?mode=ro"
+
+
+class ConnectionPool:
+    """
+    Idle connections to one SQLite database file, reused across requests.
+    Connections are created on demand; up to max_idle of them are kept open
+    between requests and the rest are closed when released.
+    """
+
+    def __init__(self, path, max_idle=8, uri=False):
+        self.path = path
+        self.uri = uri
+        self.created = 0
+        self.closed = False
+        self._idle = queue.LifoQueue(maxsize=max_idle)
+        self._lock = threading.Lock()
+
+    def connect(self):
+        try:
+            conn = self._idle.get_nowait()
+        except queue.Empty:
+            # Handed to whichever request thread checks it out next
+            conn = sqlite3.connect(self.path, uri=self.uri, factory=PooledConnection, check_same_thread=False)
+            conn._pool = self
+            with self._lock:
+                self.created += 1
+        conn._checked_out = True
+        conn._checkout = object()
+        return conn
+
+    def release(self, conn):
+        if self.closed:
+            conn.discard()
+            return
+        try:
+            # Never hand an open transaction to the next request
+            if conn.in_transaction:
+                conn.rollback()
+            self._idle.put_nowait(conn)
+        except (queue.Full, sqlite3.Error):
+            conn.discard()
+
+    def close_all(self):
+        # Close idle connections now and checked-out ones when they are released
+        self.closed = True
+        while True:
+            try:
+                self._idle.get_nowait().discard()
+            except queue.Empty:
+                return
+
+    def stats(self):
+        return {
+            "path": self.path,
+            "idle": self._idle.qsize(),
+            "created": self.created
+        }
+
+
+class AnalyticsSnapshot:
+    """
+    Read-only copy of a database, refreshed every refresh_interval seconds
+    with the SQLite backup API, for dashboard queries that can be a little
+    behind: they then never share pages, locks or the WAL with writers.
+
+    Each refresh backs up into a temporary file of its own (several worker
+    processes may refresh the same snapshot), renames it over the snapshot
+    and switches to a fresh pool, so queries running on the previous copy
+    finish undisturbed. Until a refresh has succeeded, connections are
+    taken from the source pool: live reads.
+    """
+
+    def __init__(self, name, source_pool, path, refresh_interval, max_idle=8):
+        self.name = name
+        self.source_pool = source_pool
+        self.path = path
+        self.refresh_interval = refresh_interval
+        self.max_idle = max_idle
+        self.refreshes = 0
+        self.refreshed_at = None
+        self.refresh_seconds = None
+        self._pool = None
+        self._lock = threading.Lock()
+        self._refresh_lock = threading.Lock()
+        self._stopping = threading.Event()
+        self._thread = None
+
+    def refresh(self):
+        with self._refresh_lock:
+            started = time.perf_counter()
+            # Same directory, so the rename below stays on one file system
+            directory, name = os.path.split(os.path.abspath(self.path))
+            handle, temporary_path = tempfile.mkstemp(prefix=f"{name}.", suffix='.tmp', dir=directory)
+            os.close(handle)
+            try:
+                source = self.source_pool.connect()
+                try:
+                    copy = sqlite3.connect(temporary_path)
+                    try:
+                        source.backup(copy)
+                        # Readers of the copy must not need -wal / -shm files
+                        copy.execute("PRAGMA journal_mode=DELETE")
+                    finally:
+                        copy.close()
+                finally:
+                    source.close()
+                os.replace(temporary_path, self.path)
+            except BaseException:
+                os.remove(temporary_path)
+                raise
+
+            pool = ConnectionPool(read_only_uri(self.path), max_idle=self.max_idle, uri=True)
+            with self._lock:
+                previous, self._pool = self._pool, pool
+            if previous:
+                previous.close_all()
+
+            self.refreshes += 1
+            self.refreshed_at = time.time()
+            self.refresh_seconds = time.perf_counter() - started
+
+    def connect(self):
+        with self._lock:
+            pool = self._pool
+        if pool is None:
+            # No copy yet (the first refresh failed): read live data meanwhile
+            return self.source_pool.connect()
+        return pool.connect()
+
+    def start(self):
+        with self._lock:
+            if self._thread and self._thread.is_alive():
+                return
+            self._stopping.clear()
+            self._thread = threading.Thread(target=self._run, name=f"{self.name}-snapshot", daemon=True)
+            self._thread.start()
+
+    def stop(self, timeout=5.0):
+        self._stopping.set()
+        if self._thread:
+            self._thread.join(timeout)
+
+    def stats(self):
+        return {
+            "path": self.path,
+            "refreshes": self.refreshes,
+            "age_seconds": round(time.time() - self.refreshed_at, 1) if self.refreshed_at else None,
+            "refresh_seconds": round(self.refresh_seconds, 4) if self.refresh_seconds is not None else None
+        }
+
+    def _run(self):
+        while not self._stopping.wait(self.refresh_interval):
+            try:
+                self.refresh()
+            except Exception as e:
+                # Keep serving the previous copy and try again next interval
+                print(f"Error refreshing {self.name} snapshot: {e}")
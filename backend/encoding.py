@@ -0,0 +1,128 @@
+def interned_codes(codes, size):
+    """
+    Turn an array of category codes (-1 for missing) into a list of Python
+    ints where equal codes are the same int object, so a million rows hold a
+    million pointers to `size` ints rather than a million separate ints
+    """
+    # The trailing -1 is what code -1 indexes
+    table = list(range(size)) + [-1]
+    return [table[code] for code in codes.tolist()]
+
+
+class CalibrationItem:
+    """
+    One calibration task as the allocation engines see it: the calibrator
+    (location) and due date (deadline) are integer codes into the snapshot's
+    category tables, numbered in sorted order of their text so that ordering
+    by code matches ordering by the original strings.
+
+    Unpacks and indexes like the (calibrator, serial_no, calibration__due,
+    old_workload) tuples the engines were written against.
+    """
+
+    __slots__ = ('location', 'serial_no', 'deadline', 'old_workload')
+
+    def __init__(self, location, serial_no, deadline, old_workload):
+        self.location = location
+        self.serial_no = serial_no
+        self.deadline = deadline
+        self.old_workload = old_workload
+
+    def __iter__(self):
+        yield self.location
+        yield self.serial_no
+        yield self.deadline
+        yield self.old_workload
+
+    def __getitem__(self, index):
+        return getattr(self, self.__slots__[index])
+
+    def __len__(self):
+        return 4
+
+    def __eq__(self, other):
+        return isinstance(other, CalibrationItem) and tuple(self) == tuple(other)
+
+    def __hash__(self):
+        return hash(tuple(self))
+
+    def __reduce__(self):
+        # Pickle as constructor arguments (e.g. for the sweep worker processes)
+        return CalibrationItem, tuple(self)
+
+    def __repr__(self):
+        return f"CalibrationItem({self.location!r}, {self.serial_no!r}, {self.deadline!r}, {self.old_workload!r})"
+
+
+class WorkerState:
+    """
+    Per-worker bookkeeping of the heuristic: items assigned so far and the
+    location / deadline codes the worker already covers
+    """
+
+    __slots__ = ('assigned_load', 'locations', 'deadlines')
+
+    def __init__(self):
+        self.assigned_load = 0
+        self.locations = set()
+        self.deadlines = set()
+
+
+class AllocationSnapshot:
+    """
+    Encoded input of the allocation engines: workers (pic names),
+    CalibrationItem records, the pic currently holding each item, and the
+    category tables that decode the item codes (locations[item.location] is
+    the calibrator, deadlines[item.deadline] the due date text; code -1 is a
+    missing value).
+
+    The engines reorder the workers list they are given, so callers sharing
+    a snapshot should pass list(snapshot.workers).
+    """
+
+    __slots__ = ('workers', 'items', 'current_workers', 'locations', 'deadlines')
+
+    def __init__(self, workers, items, current_workers, locations, deadlines):
+        self.workers = workers
+        self.items = items
+        self.current_workers = current_workers
+        self.locations = locations
+        self.deadlines = deadlines
+
+
+def encode_allocation_snapshot(df):
+    """
+    Build an AllocationSnapshot from a DataFrame with serial_no, pic,
+    calibrator and calibration__due columns (rows without serial_no or pic
+    already dropped). old_workload is the number of items the row's pic holds.
+    """
+    import numpy as np
+    import pandas as pd
+
+    pics = pd.Categorical(df['pic'])
+    locations = pd.Categorical(df['calibrator'])
+    deadlines = pd.Categorical(df['calibration__due'])
+
+    # Sorted distinct pics; each row points at the shared name object
+    workers = list(pics.categories)
+    current_workers = [workers[code] for code in pics.codes.tolist()]
+
+    # One shared int per pic for old_workload
+    counts = np.bincount(pics.codes, minlength=len(workers)).tolist()
+    old_workloads = [counts[code] for code in pics.codes.tolist()]
+
+    items = [
+        CalibrationItem(location, serial_no, deadline, old_workload)
+        for location, serial_no, deadline, old_workload in zip(
+            interned_codes(locations.codes, len(locations.categories)),
+            df['serial_no'].tolist(),
+            interned_codes(deadlines.codes, len(deadlines.categories)),
+            old_workloads
+        )
+    ]
+
+    return AllocationSnapshot(
+        workers, items, current_workers,
+        list(locations.categories), list(deadlines.categories)
+    )
+
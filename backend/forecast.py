@@ -0,0 +1,133 @@
+import numpy as np
+import pandas as pd
+
+from date_parsing import parse_date_series
+
+# Columns the forecast can be broken down by
+FORECAST_GROUPS = ['calibrator', 'pic', 'div']
+
+# Longest horizon the endpoint accepts (10 years)
+MAX_FORECAST_MONTHS = 120
+
+# Label for tools with no calibrator / pic / div
+UNASSIGNED = 'Unassigned'
+
+
+def month_label(month):
+    # numpy datetime64[M] -> 'YYYY-MM'
+    return str(np.datetime64(month, 'M'))
+
+
+def due_months(series):
+    # Dataset dates -> datetime64[M]
+    return parse_date_series(series).to_numpy().astype('datetime64[M]')
+
+
+def next_due_months(df, interval):
+    """
+    Month of the next calibration for every tool, as datetime64[M]: the due
+    date, or last calibration + interval when the due date is missing
+    """
+    due = due_months(df['calibration__due'])
+
+    # Only parse last calibration dates for the (usually few) tools that need them
+    missing = np.flatnonzero(np.isnat(due) & (interval > 0))
+    if len(missing):
+        last = due_months(df['last__calibration'].iloc[missing])
+        due[missing] = last + interval[missing].astype('timedelta64[M]')
+    return due
+
+
+def interval_months(df):
+    # actual_calibration_interval is in years; 0 when unknown (no recurrence)
+    years = pd.to_numeric(df['actual_calibration_interval'], errors='coerce').to_numpy(dtype=float)
+    return np.nan_to_num(np.round(years * 12), nan=0).astype(np.int64)
+
+
+def project_calibrations(offset, interval, months):
+    """
+    Expand schedules into the calibrations that fall inside a horizon of
+    months months, without looping: offset is the month of the first
+    calibration (0 = first month of the horizon) and interval the months
+    between calibrations (0 = no recurrence).
+
+    Returns (schedule_index, month_offset) arrays with one entry per calibration
+    """
+    valid = offset < months
+
+    # Number of occurrences per schedule: one, plus one per full interval left in the horizon
+    counts = np.zeros(len(offset), dtype=np.int64)
+    recurring = valid & (interval > 0)
+    counts[recurring] = (months - 1 - offset[recurring]) // interval[recurring] + 1
+    counts[valid & (interval <= 0)] = 1
+
+    schedule_index = np.repeat(np.arange(len(offset)), counts)
+    # Position of each occurrence within its schedule's run: 0, 1, 2, ...
+    run_starts = np.cumsum(counts) - counts
+    occurrence = np.arange(len(schedule_index)) - np.repeat(run_starts, counts)
+    month_offset = offset[schedule_index] + occurrence * interval[schedule_index]
+    return schedule_index, month_offset
+
+
+def count_by_month(month_offset, months, codes=None, groups=1):
+    # Dense (groups x months) table of calibration counts
+    if codes is None:
+        return np.bincount(month_offset, minlength=months)
+    cells = codes * months + month_offset
+    return np.bincount(cells, minlength=groups * months).reshape(groups, months)
+
+
+def forecast_workload(df, start, months, group_columns=FORECAST_GROUPS):
+    """
+    Project the recurring calibrations of every tool in df over the next
+    months months from start (a datetime64[M]) and count them per month,
+    overall and per value of each group column.
+    Overdue tools are counted in the first month and recur from there.
+
+    Tools are first collapsed into distinct schedules (first month within the
+    horizon, interval): a fleet has at most a few hundred of them however many
+    tools it has, so only the schedules are expanded into calibrations and
+    every breakdown is a (values x schedules) @ (schedules x months) product.
+
+    Returns a dict with the month labels, the monthly totals and, for each
+    group column, {value: monthly counts}
+    """
+    start = np.datetime64(start, 'M')
+    interval = interval_months(df)
+    due = next_due_months(df, interval)
+
+    # Months from start to the first calibration; tools without a due date or
+    # due after the horizon all land on the same, empty, schedule
+    no_due_date = np.isnat(due)
+    offset = np.clip((due - start).astype(np.int64), 0, months)
+    offset[no_due_date] = months
+    interval = np.minimum(interval, months)
+
+    schedule_of_tool, schedules = pd.factorize(offset * (months + 1) + interval)
+    schedule_offset, schedule_interval = np.divmod(schedules, months + 1)
+    schedule_index, month_offset = project_calibrations(schedule_offset, schedule_interval, months)
+    calendar = count_by_month(month_offset, months, schedule_index, len(schedules))
+
+    total = np.bincount(schedule_of_tool, minlength=len(schedules)) @ calendar
+
+    forecast = {
+        "start_month": month_label(start),
+        "months": [month_label(start + i) for i in range(months)],
+        "tools": int(len(df)),
+        "tools_without_due_date": int(no_due_date.sum()),
+        "overdue": int(((due < start) & ~no_due_date).sum()),
+        "calibrations": int(total.sum()),
+        "total": total.tolist()
+    }
+
+    for column in group_columns:
+        codes, values = pd.factorize(df[column].fillna(UNASSIGNED))
+        tools_per_schedule = np.bincount(
+            codes * len(schedules) + schedule_of_tool, minlength=len(values) * len(schedules)
+        ).reshape(len(values), len(schedules))
+        table = tools_per_schedule @ calendar
+        forecast[f"by_{column}"] = {
+            str(value): row.tolist() for value, row in zip(values, table)
+        }
+
+    return forecast
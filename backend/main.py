@@ -1,28 +1,127 @@
-from flask import Flask, jsonify, request
+import time
+# Measured from the first line so create_app can report the import cost
+IMPORT_STARTED = time.perf_counter()
+
+from flask import Blueprint, Flask, Response, current_app, has_request_context, jsonify, request, stream_with_context
 from flask_cors import CORS
-import pandas as pd
-import sqlite3
+from werkzeug.utils import secure_filename
 import os
 import datetime
 import json
+import math
 import uuid
-import random
-import numpy as np
+import tempfile
+from urllib.parse import quote
+import atexit
+from concurrent.futures import ThreadPoolExecutor
+
+from allocation import (
+    ALLOCATION_ENGINES,
+    SWEEP_PARAMETERS,
+    apply_heuristic_model,
+    assign_items_to_target_loads,
+    improve_allocation,
+    solve_min_cost_allocation,
+    sweep_heuristic_weights,
+)
+from date_parsing import cache_stats as date_cache_stats, parse_date, parse_date_series, to_db_format
+from db_pool import AnalyticsSnapshot, ConnectionPool, read_only_uri
+from encoding import encode_allocation_snapshot
+from single_flight import SingleFlightCache
+from write_behind import WriteBehindBuffer
+
+# pandas, NumPy and bulk_io (which pulls in pyarrow) are imported inside the
+# routes that use them, so worker processes start without paying for them
+
+api = Blueprint('api', __name__)
+
+def load_plant_databases(config):
+    """
+    Parse the BOSCH_PLANTS setting into {plant: database file}:
+    - "north=north.db,south=/data/south.db" -> two plants
+    - "north,south" -> north.db and south.db
+    - "" -> a single 'default' plant using bosch.db
+    """
+    plants = {}
+    for entry in config.split(','):
+        name, _, path = entry.strip().partition('=')
+        if name.strip():
+            plants[name.strip()] = path.strip() or f"{name.strip()}.db"
+    return plants or {'default': 'bosch.db'}
+
+# One database file per plant; the first plant is the default
+PLANT_DATABASES = load_plant_databases(os.environ.get('BOSCH_PLANTS', ''))
+DEFAULT_PLANT = next(iter(PLANT_DATABASES))
+DB_POOL_SIZE = int(os.environ.get('DB_POOL_SIZE', 8))
 
-app = Flask(__name__)
-# Simple CORS configuration
-CORS(app)
+# Per plant: a pool of writable connections and a pool of read-only ones, which
+# under WAL never wait for (or hold up) a write
+plant_pools = {
+    plant: ConnectionPool(path, max_idle=DB_POOL_SIZE)
+    for plant, path in PLANT_DATABASES.items()
+}
+plant_read_pools = {
+    plant: ConnectionPool(read_only_uri(path), max_idle=DB_POOL_SIZE, uri=True)
+    for plant, path in PLANT_DATABASES.items()
+}
+
+# Optional: serve dashboard queries from a copy of each plant database,
+# refreshed every ANALYTICS_SNAPSHOT_SECONDS (0, the default, reads live data)
+ANALYTICS_SNAPSHOT_SECONDS = float(os.environ.get('ANALYTICS_SNAPSHOT_SECONDS', 0))
+plant_snapshots = {
+    plant: AnalyticsSnapshot(
+        f"{plant}-analytics", plant_read_pools[plant], f"{path}.snapshot",
+        ANALYTICS_SNAPSHOT_SECONDS, max_idle=DB_POOL_SIZE
+    )
+    for plant, path in PLANT_DATABASES.items()
+} if ANALYTICS_SNAPSHOT_SECONDS > 0 else {}
+
+def get_plant():
+    # Plant selected with ?plant= on the current request, else the default plant
+    if has_request_context():
+        return request.args.get('plant') or DEFAULT_PLANT
+    return DEFAULT_PLANT
+
+def get_db_connection(plant=None):
+    # close() on the returned connection hands it back to the plant's pool
+    try:
+        conn = plant_pools[plant or get_plant()].connect()
+        return conn
+    except Exception as e:
+        print(f"Error connecting to database: {e}")
+        return None
 
-def get_db_connection():
+def get_read_connection(plant=None):
+    # Read-only connection for endpoints that never write
     try:
-        conn = sqlite3.connect('bosch.db')
+        conn = plant_read_pools[plant or get_plant()].connect()
         return conn
     except Exception as e:
         print(f"Error connecting to database: {e}")
         return None
 
-@app.route('/api/create-and-load', methods=['POST'])
+def get_analytics_connection(plant=None):
+    # Read-only connection to the analytics snapshot when enabled, else to live data
+    plant = plant or get_plant()
+    if plant not in plant_snapshots:
+        return get_read_connection(plant)
+    try:
+        conn = plant_snapshots[plant].connect()
+        return conn
+    except Exception as e:
+        print(f"Error connecting to analytics snapshot: {e}")
+        return None
+
+@api.before_request
+def check_plant():
+    plant = request.args.get('plant')
+    if plant and plant not in plant_pools:
+        return jsonify({"error": f"Unknown plant: {plant}", "plants": list(plant_pools)}), 404
+
+@api.route('/api/create-and-load', methods=['POST'])
 def create_and_load():
+    import pandas as pd
+
     try:
         # Read CSV file
         df = pd.read_csv("Bosch-Dataset-CSV(2).csv")
@@ -36,7 +135,17 @@ def create_and_load():
         
         # Create table and load data directly using pandas
         df.to_sql('bosch_equipment', conn, if_exists='replace', index=True)
-        
+
+        # Replacing the table drops the search triggers and the due date column, so recreate them
+        create_equipment_search_index(conn, rebuild=True)
+        create_due_date_column(conn)
+
+        # Tell change feed clients to re-fetch the whole inventory
+        cursor = conn.cursor()
+        seed_history(cursor)
+        record_change(cursor, 'bosch_equipment', None, 'reload')
+        conn.commit()
+
         return jsonify({"message": "Data loaded successfully"}), 200
 
     except Exception as e:
@@ -46,11 +155,123 @@ def create_and_load():
         if conn:
             conn.close()
 
-@app.route('/api/view-data', methods=['GET'])
-def view_data():
+@api.route('/api/import/<table_name>', methods=['POST'])
+def bulk_import(table_name):
+    import bulk_io
+
+    conn = None
+    upload_path = None
     try:
+        if table_name not in bulk_io.BULK_TABLES:
+            return jsonify({"error": f"Unsupported table: {table_name}"}), 400
+
+        upload = request.files.get('file')
+        if not upload:
+            return jsonify({"error": "A 'file' upload is required"}), 400
+
+        file_format = bulk_io.detect_format(upload.filename or '', request.args.get('format'))
+        if file_format == 'parquet' and not bulk_io.PARQUET_AVAILABLE:
+            return jsonify({"error": "Parquet import requires pyarrow, upload a CSV file instead"}), 400
+
+        # Spool the upload to disk so it can be read back one batch at a time
+        handle, upload_path = tempfile.mkstemp(suffix=f".{file_format}")
+        os.close(handle)
+        upload.save(upload_path)
+
         conn = get_db_connection()
-        df = pd.read_sql_query("SELECT * FROM bosch_equipment LIMIT 100", conn)
+        if not conn:
+            return jsonify({"error": "Database connection failed"}), 500
+
+        started = time.perf_counter()
+        batch_rows = request.args.get('batch_rows', bulk_io.DEFAULT_BATCH_ROWS, type=int)
+
+        # One transaction for the rows, the table swap, its generated column,
+        # indexes and search index, and the change log / history entries: a
+        # bad file leaves everything as it was
+        conn.execute("BEGIN")
+        try:
+            # The search index is rebuilt from its columns below, so they must be there too
+            rows_imported = bulk_io.import_table(
+                conn, table_name, upload_path, file_format, batch_rows,
+                required_columns=SEARCH_COLUMNS if table_name == 'bosch_equipment' else ()
+            )
+
+            cursor = conn.cursor()
+            if table_name == 'bosch_equipment':
+                bulk_io.replace_with_staging(conn, table_name)
+                create_equipment_search_index(conn, rebuild=True)
+                create_due_date_column(conn)
+                seed_history(cursor)
+            record_change(cursor, table_name, None, 'reload')
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+
+        elapsed = time.perf_counter() - started
+        print(f"Imported {rows_imported} rows into {table_name} from {file_format} in {elapsed:.2f}s")
+
+        return jsonify({
+            "message": "Data imported successfully",
+            "table": table_name,
+            "format": file_format,
+            "rows_imported": rows_imported,
+            "seconds": round(elapsed, 3)
+        }), 200
+
+    except ValueError as e:
+        # The file does not fit the table
+        print(f"Rejected import into {table_name}: {str(e)}")
+        return jsonify({"error": str(e)}), 400
+    except Exception as e:
+        print(f"Error importing {table_name}: {str(e)}")
+        return jsonify({"error": str(e)}), 500
+    finally:
+        if conn:
+            conn.close()
+        if upload_path:
+            bulk_io.remove_quietly(upload_path)
+
+@api.route('/api/export/<table_name>', methods=['GET'])
+def bulk_export(table_name):
+    import bulk_io
+
+    if table_name not in bulk_io.BULK_TABLES:
+        return jsonify({"error": f"Unsupported table: {table_name}"}), 400
+
+    # Fall back to CSV when pyarrow is not installed
+    file_format = request.args.get('format', 'parquet').lower()
+    if file_format not in bulk_io.FILE_FORMATS:
+        return jsonify({"error": f"Unsupported format '{file_format}', expected one of {bulk_io.FILE_FORMATS}"}), 400
+    if file_format == 'parquet' and not bulk_io.PARQUET_AVAILABLE:
+        file_format = 'csv'
+    batch_rows = request.args.get('batch_rows', bulk_io.DEFAULT_BATCH_ROWS, type=int)
+    plant = get_plant()
+
+    def generate():
+        conn = get_read_connection(plant)
+        if not conn:
+            return
+        try:
+            yield from bulk_io.iter_export_chunks(conn, table_name, file_format, batch_rows)
+        finally:
+            conn.close()
+
+    mimetype = 'application/vnd.apache.parquet' if file_format == 'parquet' else 'text/csv'
+    filename = bulk_io.export_filename(table_name, file_format)
+    return Response(
+        stream_with_context(generate()),
+        mimetype=mimetype,
+        headers={'Content-Disposition': f'attachment; filename="{filename}"'}
+    )
+
+@api.route('/api/view-data', methods=['GET'])
+def view_data():
+    import pandas as pd
+
+    try:
+        conn = get_read_connection()
+        df = pd.read_sql_query(f"SELECT {equipment_select_sql(conn.cursor())} FROM bosch_equipment LIMIT 100", conn)
         return jsonify({"data": df.to_dict('records')}), 200
 
     except Exception as e:
@@ -59,15 +280,17 @@ def view_data():
         if conn:
             conn.close()
 
-@app.route('/api/view-fault-data', methods=['GET'])
+@api.route('/api/view-fault-data', methods=['GET'])
 def view_fault_data():
+    import pandas as pd
+
     try:
-        conn = get_db_connection()
+        conn = get_read_connection()
         if not conn:
             return jsonify({"error": "Database connection failed"}), 500
             
         # Query the bosch_equipment table for FA division
-        df = pd.read_sql_query("SELECT * FROM bosch_equipment WHERE div='FA'", conn)
+        df = pd.read_sql_query(f"SELECT {equipment_select_sql(conn.cursor())} FROM bosch_equipment WHERE div='FA'", conn)
         return jsonify({"data": df.to_dict('records')}), 200
         
     except Exception as e:
@@ -77,20 +300,54 @@ def view_fault_data():
         if conn:
             conn.close()
 
-@app.route('/api/no1', methods=['POST', 'GET'])
+def utc_timestamp():
+    # Same format as SQLite's CURRENT_TIMESTAMP
+    return datetime.datetime.now(datetime.timezone.utc).strftime('%Y-%m-%d %H:%M:%S')
+
+def write_date_selections(rows):
+    # Store a batch of (plant, selected_date, timestamp) rows, one transaction per plant
+    rows_by_plant = {}
+    for plant, selected_date, timestamp in rows:
+        rows_by_plant.setdefault(plant, []).append((selected_date, timestamp))
+
+    for plant, plant_rows in rows_by_plant.items():
+        conn = get_db_connection(plant)
+        if not conn:
+            raise RuntimeError(f"Database connection failed for plant {plant}")
+        try:
+            conn.executemany(
+                "INSERT INTO date_selections (selected_date, timestamp) VALUES (?, ?)",
+                plant_rows
+            )
+            conn.commit()
+        finally:
+            conn.close()
+
+# Calendar clicks are logged write-behind so the request never waits on a commit
+date_selection_buffer = WriteBehindBuffer(
+    'date_selections',
+    write_date_selections,
+    max_size=int(os.environ.get('DATE_SELECTION_BUFFER_SIZE', 10000)),
+    batch_size=500,
+    flush_interval=float(os.environ.get('DATE_SELECTION_FLUSH_SECONDS', 2.0))
+)
+
+@api.route('/api/no1', methods=['POST', 'GET'])
 def handle_date_selection():
     try:
         # Check if this is a request for calibration data
         get_data = request.args.get('get_data', 'false').lower() == 'true'
         
         if get_data and request.method == 'GET':
+            import pandas as pd
+
             # Return calibration data from the database
             try:
                 # Initialize empty calibration data
                 calibration_data = {}
                 
                 # Get calibration data from database
-                conn = get_db_connection()
+                conn = get_read_connection()
                 if not conn:
                     return jsonify({"error": "Database connection failed"}), 500
                 
@@ -101,62 +358,20 @@ def handle_date_selection():
                         conn
                     )
                     
-                    # Process the data to organize by date
-                    for _, row in df.iterrows():
-                        try:
-                            # Format date to YYYY-MM-DD (handling the format in the CSV: "12-Oct-26")
-                            if pd.notna(row['calibration__due']):
-                                try:
-                                    # First try direct parsing with strptime
-                                    due_date = datetime.datetime.strptime(row['calibration__due'], '%d-%b-%y')
-                                    date_key = due_date.strftime('%Y-%m-%d')
-                                    
-                                    # Add to calibration data
-                                    if date_key not in calibration_data:
-                                        calibration_data[date_key] = []
-                                    
-                                    calibration_data[date_key].append({
-                                        "name": row['description'] if pd.notna(row['description']) else 'Unknown Equipment',
-                                        "serial": row['serial_no'] if pd.notna(row['serial_no']) else 'No Serial',
-                                        "company": row['calibrator'] if pd.notna(row['calibrator']) else 'Unknown Company'
-                                    })
-                                except ValueError:
-                                    try:
-                                        # If that fails, try manual parsing
-                                        date_parts = row['calibration__due'].split('-')
-                                        if len(date_parts) == 3:
-                                            day = date_parts[0]
-                                            month = date_parts[1]
-                                            year = date_parts[2]
-                                            
-                                            # Add '20' prefix if the year is only 2 digits
-                                            if len(year) == 2:
-                                                year = '20' + year
-                                            
-                                            # Reconstruct the date string
-                                            date_str = f"{day}-{month}-{year}"
-                                            
-                                            # Parse the date
-                                            due_date = datetime.datetime.strptime(date_str, '%d-%b-%Y')
-                                            date_key = due_date.strftime('%Y-%m-%d')
-                                            
-                                            # Add to calibration data
-                                            if date_key not in calibration_data:
-                                                calibration_data[date_key] = []
-                                            
-                                            calibration_data[date_key].append({
-                                                "name": row['description'] if pd.notna(row['description']) else 'Unknown Equipment',
-                                                "serial": row['serial_no'] if pd.notna(row['serial_no']) else 'No Serial',
-                                                "company": row['calibrator'] if pd.notna(row['calibrator']) else 'Unknown Company'
-                                            })
-                                        else:
-                                            # Skip this row if date format is invalid
-                                            continue
-                                    except Exception as parse_error:
-                                        print(f"Error parsing date '{row['calibration__due']}': {parse_error}")
-                                        continue
-                        except Exception as date_error:
-                            print(f"Error processing date: {row['calibration__due']}, {date_error}")
+                    # Process the data to organize by date (YYYY-MM-DD); every distinct
+                    # due date is parsed once, whichever format it was stored in
+                    due_dates = parse_date_series(df['calibration__due'])
+                    unparsed = df.loc[due_dates.isna(), 'calibration__due'].unique()
+                    for value in unparsed:
+                        print(f"Error parsing date '{value}': unrecognised date format")
+
+                    df = df.assign(date_key=due_dates.dt.strftime('%Y-%m-%d'))[due_dates.notna()]
+                    for row in df.itertuples(index=False):
+                        calibration_data.setdefault(row.date_key, []).append({
+                            "name": row.description if pd.notna(row.description) else 'Unknown Equipment',
+                            "serial": row.serial_no if pd.notna(row.serial_no) else 'No Serial',
+                            "company": row.calibrator if pd.notna(row.calibrator) else 'Unknown Company'
+                        })
                 except Exception as db_error:
                     print(f"Database error when fetching calibration data: {str(db_error)}")
                     return jsonify({
@@ -187,34 +402,24 @@ def handle_date_selection():
         # Log the date selection
         print(f"Date selected: {date}")
         
-        # Store the date selection in the database
-        conn = get_db_connection()
+        # Queue the date selection; the background writer stores it in batches
+        date_stored = date_selection_buffer.add((get_plant(), date, utc_timestamp()))
+        if not date_stored:
+            return jsonify({
+                "message": f"Date selection received: {date}",
+                "status": "partial_success",
+                "error": "Date selection log is full, selection was not recorded"
+            }), 200
+        
+        conn = get_read_connection()
         if not conn:
             return jsonify({"error": "Database connection failed"}), 500
         
         try:
-            # Create a table for date selections if it doesn't exist
-            conn.execute('''
-                CREATE TABLE IF NOT EXISTS date_selections (
-                    id INTEGER PRIMARY KEY AUTOINCREMENT,
-                    selected_date TEXT NOT NULL,
-                    timestamp DATETIME DEFAULT CURRENT_TIMESTAMP
-                )
-            ''')
-            
-            # Insert the selected date
-            conn.execute(
-                "INSERT INTO date_selections (selected_date) VALUES (?)",
-                (date,)
-            )
-            
-            # Commit the changes
-            conn.commit()
-            
             # Get equipment due for calibration on the selected date
             cursor = conn.cursor()
             cursor.execute(
-                "SELECT COUNT(*) FROM bosch_equipment WHERE date(calibration__due) = date(?)",
+                "SELECT COUNT(*) FROM bosch_equipment WHERE calibration_due_date = date(?)",
                 (date,)
             )
             equipment_count = cursor.fetchone()[0]
@@ -223,7 +428,7 @@ def handle_date_selection():
                 "message": f"Date selection received: {date}",
                 "status": "success",
                 "details": {
-                    "date_stored": True,
+                    "date_stored": date_stored,
                     "equipment_count": equipment_count,
                     "timestamp": datetime.datetime.now().isoformat()
                 }
@@ -245,22 +450,50 @@ def handle_date_selection():
         print(f"Error handling request: {str(e)}")
         return jsonify({"error": str(e)}), 500
 
-@app.route('/api/tools-inventory', methods=['GET'])
+@api.route('/api/tools-inventory', methods=['GET'])
 def get_tools_inventory():
+    import pandas as pd
+
     try:
-        conn = get_db_connection()
+        conn = get_read_connection()
         if not conn:
             return jsonify({"error": "Database connection failed"}), 500
         
-        # First, let's get the column names from the table to make sure we're using the right ones
+        # Select all columns, with the remaining months computed from the due date
+        # rather than the value loaded from the CSV
         cursor = conn.cursor()
-        cursor.execute("PRAGMA table_info(bosch_equipment)")
-        columns = [column[1] for column in cursor.fetchall()]
-        
-        # Build a query that selects all columns
-        query = f"SELECT * FROM bosch_equipment"
-        
-        df = pd.read_sql_query(query, conn)
+        query = f"SELECT {equipment_select_sql(cursor)} FROM bosch_equipment"
+        # Generated columns are only listed by table_xinfo
+        columns = [column[1] for column in cursor.execute("PRAGMA table_xinfo(bosch_equipment)").fetchall()]
+
+        # Optional urgency filters, evaluated in SQL against the indexed due date:
+        # - ?due=overdue: due date before today
+        # - ?due_within_months=2: due (or overdue) within the next 2 months
+        # - ?sort=due_date&order=asc|desc: soonest (or latest) due first, undated last
+        conditions = []
+        params = []
+        due = request.args.get('due')
+        due_within_months = request.args.get('due_within_months', type=float)
+        sort = request.args.get('sort')
+        order = request.args.get('order', 'asc').lower()
+        if due not in (None, 'overdue'):
+            return jsonify({"error": "due must be 'overdue'"}), 400
+        if sort not in (None, 'due_date', 'remaining_months') or order not in ('asc', 'desc'):
+            return jsonify({"error": "sort must be 'due_date' or 'remaining_months' and order 'asc' or 'desc'"}), 400
+        if (due or due_within_months is not None or sort) and 'calibration_due_date' not in columns:
+            return jsonify({"error": "Due date filters are not available until the data is loaded"}), 400
+
+        if due == 'overdue':
+            conditions.append("calibration_due_date < date('now')")
+        if due_within_months is not None:
+            conditions.append(f"calibration_due_date < date(julianday('now') + ? * {DAYS_PER_MONTH})")
+            params.append(due_within_months)
+        if conditions:
+            query += " WHERE " + " AND ".join(conditions)
+        if sort:
+            query += f" ORDER BY calibration_due_date IS NULL, calibration_due_date {order.upper()}"
+
+        df = pd.read_sql_query(query, conn, params=params)
         
         # Convert the DataFrame to a list of dictionaries
         tools_inventory = df.to_dict('records')
@@ -278,6 +511,304 @@ def get_tools_inventory():
         if conn:
             conn.close()
 
+# Columns of bosch_equipment covered by the full-text search index
+SEARCH_COLUMNS = ['description', 'brand', 'model_no', 'serial_no', 'tag', 'range']
+# bm25 weights, in the same order as SEARCH_COLUMNS
+SEARCH_COLUMN_WEIGHTS = '10.0, 4.0, 6.0, 8.0, 2.0, 1.0'
+# Highest ?page= of a search; (page - 1) * page_size must fit an SQLite OFFSET
+MAX_SEARCH_PAGE = 10000
+
+def build_search_query(text):
+    """
+    Turn free text from the search box into an FTS5 MATCH expression.
+    Every word is quoted (so '-', '/' etc. are taken literally) and
+    prefix-matched, and all words must match:
+    - blade micro -> "blade"* "micro"*
+    - 691-101 -> "691-101"*
+    """
+    terms = [term.replace('"', '') for term in text.split()]
+    return ' '.join(f'"{term}"*' for term in terms if term)
+
+@api.route('/api/tools/search', methods=['GET'])
+def search_tools():
+    conn = None
+    try:
+        text = request.args.get('q', '').strip()
+        page = max(request.args.get('page', 1, type=int), 1)
+        page_size = min(max(request.args.get('page_size', 25, type=int), 1), 100)
+        if page > MAX_SEARCH_PAGE:
+            return jsonify({"error": f"page must be at most {MAX_SEARCH_PAGE}"}), 400
+
+        match_query = build_search_query(text)
+        if not match_query:
+            return jsonify({"error": "Search parameter 'q' is required"}), 400
+
+        conn = get_read_connection()
+        if not conn:
+            return jsonify({"error": "Database connection failed"}), 500
+
+        cursor = conn.cursor()
+        cursor.execute(
+            "SELECT COUNT(*) FROM equipment_search WHERE equipment_search MATCH ?",
+            (match_query,)
+        )
+        total = cursor.fetchone()[0]
+
+        # Rank with bm25, weighting description and serial number matches highest
+        cursor.execute(
+            f"""
+            SELECT {equipment_select_sql(conn.cursor(), 'e')}, bm25(equipment_search, {SEARCH_COLUMN_WEIGHTS}) AS score
+            FROM equipment_search
+            JOIN bosch_equipment e ON e."index" = equipment_search.rowid
+            WHERE equipment_search MATCH ?
+            ORDER BY score
+            LIMIT ? OFFSET ?
+            """,
+            (match_query, page_size, (page - 1) * page_size)
+        )
+        columns = [column[0] for column in cursor.description]
+        results = [dict(zip(columns, row)) for row in cursor.fetchall()]
+
+        # Map 'index' to 'id' for frontend compatibility
+        for tool in results:
+            tool['id'] = tool['index']
+
+        return jsonify({
+            "query": text,
+            "page": page,
+            "page_size": page_size,
+            "total": total,
+            "results": results
+        }), 200
+
+    except Exception as e:
+        print(f"Error searching tools: {str(e)}")
+        return jsonify({"error": str(e)}), 500
+    finally:
+        if conn:
+            conn.close()
+
+@api.route('/api/calibration-forecast', methods=['GET'])
+def calibration_forecast():
+    """
+    Project recurring calibrations over the next ?months= months (default 60)
+    from ?start=YYYY-MM (default this month), counted per month and per
+    calibrator, pic and div. ?in_use=Y limits the forecast to tools in use
+    """
+    import numpy as np
+    import pandas as pd
+    from forecast import MAX_FORECAST_MONTHS, forecast_workload
+
+    conn = None
+    try:
+        months = request.args.get('months', 60, type=int)
+        if not 0 < months <= MAX_FORECAST_MONTHS:
+            return jsonify({"error": f"months must be between 1 and {MAX_FORECAST_MONTHS}"}), 400
+
+        start = request.args.get('start') or datetime.date.today().strftime('%Y-%m')
+        try:
+            start = np.datetime64(start, 'M')
+        except ValueError:
+            return jsonify({"error": "start must be a month in YYYY-MM format"}), 400
+
+        conn = get_analytics_connection()
+        if not conn:
+            return jsonify({"error": "Database connection failed"}), 500
+
+        # Only the columns the forecast needs
+        query = """
+            SELECT actual_calibration_interval, last__calibration, calibration__due,
+                   calibrator, pic, div
+            FROM bosch_equipment
+        """
+        params = ()
+        if request.args.get('in_use'):
+            query += " WHERE in_use = ?"
+            params = (request.args.get('in_use'),)
+
+        started = time.perf_counter()
+        df = pd.read_sql_query(query, conn, params=params)
+        loaded = time.perf_counter()
+
+        forecast = forecast_workload(df, start, months)
+        finished = time.perf_counter()
+
+        forecast["seconds"] = {
+            "query": round(loaded - started, 4),
+            "forecast": round(finished - loaded, 4)
+        }
+        return jsonify(forecast), 200
+
+    except Exception as e:
+        print(f"Error forecasting calibrations: {str(e)}")
+        return jsonify({"error": str(e)}), 500
+    finally:
+        if conn:
+            conn.close()
+
+@api.route('/api/shipment-batches', methods=['GET'])
+def shipment_batches():
+    """
+    Plan calibration shipments: tools due within ?horizon_days= (default 90,
+    overdue included) grouped per calibrator and external_cal into batches of
+    at most ?capacity= tools due within ?window_days= of each other.
+    ?calibrator= and ?external_cal= narrow the plan
+    """
+    from shipments import DEFAULT_CAPACITY, DEFAULT_HORIZON_DAYS, DEFAULT_WINDOW_DAYS, plan_shipments
+
+    conn = None
+    try:
+        window_days = request.args.get('window_days', DEFAULT_WINDOW_DAYS, type=int)
+        capacity = request.args.get('capacity', DEFAULT_CAPACITY, type=int)
+        horizon_days = request.args.get('horizon_days', DEFAULT_HORIZON_DAYS, type=int)
+        if window_days < 0 or capacity < 1 or horizon_days < 0:
+            return jsonify({"error": "window_days and horizon_days must be 0 or more, capacity 1 or more"}), 400
+
+        conn = get_analytics_connection()
+        if not conn:
+            return jsonify({"error": "Database connection failed"}), 500
+
+        cursor = conn.cursor()
+        columns = [column[1] for column in cursor.execute("PRAGMA table_xinfo(bosch_equipment)").fetchall()]
+        if 'calibration_due_date' not in columns:
+            return jsonify({"error": "Shipment planning is not available until the data is loaded"}), 400
+
+        # Sorted in SQL, so planning is a single pass. SQLite walks the
+        # (calibrator, due date) index and sorts each calibrator's due tools
+        # by external_cal with a small temp B-tree, rather than sorting them all
+        query = """
+            SELECT "index", serial_no, description, calibrator, external_cal,
+                   calibration__due, calibration_due_date
+            FROM bosch_equipment
+            WHERE calibration_due_date <= ?
+        """
+        # The horizon and the planner's overdue cut-off share the server's local date
+        today = datetime.date.today()
+        params = [(today + datetime.timedelta(days=horizon_days)).isoformat()]
+        for column in ('calibrator', 'external_cal'):
+            if request.args.get(column):
+                query += f" AND {column} = ?"
+                params.append(request.args.get(column))
+        query += " ORDER BY calibrator, external_cal, calibration_due_date"
+
+        started = time.perf_counter()
+        items = (
+            (row[3], row[4], datetime.date.fromisoformat(row[6]), {
+                "id": row[0],
+                "serial_no": row[1],
+                "description": row[2],
+                "calibration__due": row[5]
+            })
+            for row in cursor.execute(query, params)
+        )
+        batches = plan_shipments(items, window_days, capacity, today)
+        tools = sum(batch["size"] for batch in batches)
+
+        return jsonify({
+            "window_days": window_days,
+            "capacity": capacity,
+            "horizon_days": horizon_days,
+            "tools": tools,
+            "shipments": len(batches),
+            "batches": batches,
+            "seconds": round(time.perf_counter() - started, 4)
+        }), 200
+
+    except Exception as e:
+        print(f"Error planning shipments: {str(e)}")
+        return jsonify({"error": str(e)}), 500
+    finally:
+        if conn:
+            conn.close()
+
+# Schedules exportable per worker or per calibrator; each is served by an
+# index on (column, calibration_due_date)
+SCHEDULE_KINDS = ['pic', 'calibrator']
+SCHEDULE_FORMATS = {'ics': 'text/calendar', 'csv': 'text/csv'}
+
+@api.route('/api/schedules/<kind>/<name>', methods=['GET'])
+def export_schedule(kind, name):
+    """
+    Calibration schedule of one pic or calibrator, in due date order, as
+    iCalendar (default, for calendar subscriptions) or CSV: ?format=csv, or
+    a .ics / .csv suffix on the name (/api/schedules/pic/JS.ics).
+    Rows are streamed from an index range scan, one batch at a time. The
+    ETag is the change log version, so calendars refreshing an unchanged
+    schedule get a 304 without any rows being read.
+    """
+    import schedule_export
+
+    if kind not in SCHEDULE_KINDS:
+        return jsonify({"error": f"Unknown schedule '{kind}', expected one of {SCHEDULE_KINDS}"}), 400
+
+    file_format = request.args.get('format')
+    if not file_format:
+        stem, _, suffix = name.rpartition('.')
+        if stem and suffix.lower() in SCHEDULE_FORMATS:
+            name, file_format = stem, suffix
+    file_format = (file_format or 'ics').lower()
+    if file_format not in SCHEDULE_FORMATS:
+        return jsonify({"error": f"Unsupported format '{file_format}', expected one of {list(SCHEDULE_FORMATS)}"}), 400
+
+    # Headers are built before the connection is taken: names can hold
+    # newlines and non-ASCII text (quoted as RFC 5987 filename*)
+    filename = f"{kind}-{' '.join(name.split())}.{file_format}"
+    disposition = (
+        f'inline; filename="{secure_filename(filename) or f"schedule.{file_format}"}"; '
+        f"filename*=UTF-8''{quote(filename, safe='')}"
+    )
+
+    plant = get_plant()
+    conn = get_read_connection(plant)
+    if not conn:
+        return jsonify({"error": "Database connection failed"}), 500
+
+    # Until the response owns the connection, every exit must give it back
+    try:
+        # One read transaction, so the ETag and the rows describe the same data
+        conn.execute("BEGIN")
+        latest = conn.execute("SELECT seq, changed_at FROM change_log ORDER BY seq DESC LIMIT 1").fetchone()
+        version, changed_at = latest or (0, None)
+        etag = f"{plant}-{version}"
+        if request.if_none_match.contains(etag):
+            conn.close()
+            response = Response(status=304)
+            response.set_etag(etag)
+            return response
+
+        if not conn.execute(f"SELECT 1 FROM bosch_equipment WHERE {kind} = ? LIMIT 1", (name,)).fetchone():
+            conn.close()
+            return jsonify({"error": f"No tools for {kind} '{name}'"}), 404
+
+        columns = ', '.join(f'"{column}"' for column in schedule_export.SCHEDULE_COLUMNS)
+        cursor = conn.execute(
+            f"SELECT {columns} FROM bosch_equipment WHERE {kind} = ? ORDER BY calibration_due_date",
+            (name,)
+        )
+
+        def generate():
+            if file_format == 'csv':
+                yield from schedule_export.iter_csv(cursor)
+            else:
+                # DTSTAMP is the time of the last change, so the file only changes with the data
+                stamp = (changed_at or '1970-01-01T00:00:00').replace('-', '').replace(':', '')[:15] + 'Z'
+                uid_prefix = f"dl-week-{plant}"
+                yield from schedule_export.iter_ics(cursor, f"Calibrations: {name}", uid_prefix, stamp)
+
+        response = Response(stream_with_context(generate()), mimetype=SCHEDULE_FORMATS[file_format])
+        response.set_etag(etag)
+        # Cached copies must be revalidated, which the ETag makes cheap
+        response.headers['Cache-Control'] = 'no-cache'
+        response.headers['Content-Disposition'] = disposition
+        # Released only here, once the body is sent or the client goes away
+        response.call_on_close(conn.closer())
+        return response
+
+    except Exception as e:
+        conn.close()
+        print(f"Error exporting {kind} schedule: {str(e)}")
+        return jsonify({"error": str(e)}), 500
+
 def convert_date_format(date_str):
     """
     Convert various date formats to the format used in the database (DD-MMM-YY)
@@ -286,42 +817,13 @@ def convert_date_format(date_str):
     - 06-June-2025 -> 06-Jun-25
     - 06-Jun-2025 -> 06-Jun-25
     - 2025-06-06 -> 06-Jun-25
+    Values that are not dates are returned unchanged.
     """
     if not date_str:
         return date_str
-    
-    try:
-        # Try different date formats
-        date_obj = None
-        formats_to_try = [
-            '%d/%m/%Y',  # 06/06/2025
-            '%d-%B-%Y',  # 06-June-2025
-            '%d-%b-%Y',  # 06-Jun-2025
-            '%Y-%m-%d',  # 2025-06-06
-            '%m/%d/%Y',  # 06/06/2025 (US format)
-            '%d-%m-%Y',  # 06-06-2025
-            '%d %B %Y',  # 06 June 2025
-            '%d %b %Y',  # 06 Jun 2025
-        ]
-        
-        for date_format in formats_to_try:
-            try:
-                date_obj = datetime.datetime.strptime(date_str, date_format)
-                break
-            except ValueError:
-                continue
-        
-        if date_obj:
-            # Convert to the format used in the database (DD-MMM-YY)
-            return date_obj.strftime('%d-%b-%y')
-        else:
-            # If all formats fail, return the original string
-            return date_str
-    except Exception as e:
-        print(f"Error converting date format: {e}")
-        return date_str
+    return to_db_format(date_str)
 
-@app.route('/api/update-tool', methods=['POST'])
+@api.route('/api/update-tool', methods=['POST'])
 def update_tool():
     conn = None
     try:
@@ -384,12 +886,16 @@ def update_tool():
         print(f"With values: {values}")
         
         cursor.execute(query, values)
-        conn.commit()
         
         # Check if any rows were affected
         if cursor.rowcount == 0:
             return jsonify({"error": f"No tool found with ID {tool_data['id']}"}), 404
         
+        # Log the change and the new version in the same transaction as the update
+        record_history(cursor, 'update', '"index" = ?', (tool_data['id'],))
+        record_change(cursor, 'bosch_equipment', tool_data['id'], 'update')
+        conn.commit()
+        
         return jsonify({
             "status": "success",
             "message": "Tool updated successfully",
@@ -403,73 +909,471 @@ def update_tool():
         if conn:
             conn.close()
 
-# Create a table for malfunction reports if it doesn't exist
-def create_malfunction_reports_table():
-    conn = get_db_connection()
-    if not conn:
-        print("Failed to connect to database when creating malfunction_reports table")
-        return False
-    
-    try:
-        conn.execute('''
-            CREATE TABLE IF NOT EXISTS malfunction_reports (
-                id TEXT PRIMARY KEY,
-                tool_id TEXT NOT NULL,
-                tool_name TEXT NOT NULL,
-                serial_number TEXT NOT NULL,
-                severity TEXT NOT NULL,
-                description TEXT NOT NULL,
-                reported_at TEXT NOT NULL,
-                UNIQUE(tool_id)
-            )
-        ''')
-        conn.commit()
-        print("Malfunction reports table created or already exists")
-        return True
-    except Exception as e:
-        print(f"Error creating malfunction_reports table: {e}")
+# Create the FTS5 search index over bosch_equipment and the triggers keeping it in sync.
+# Runs in the caller's transaction; the caller commits.
+def create_equipment_search_index(conn, rebuild=False):
+    cursor = conn.cursor()
+    cursor.execute("SELECT name FROM sqlite_master WHERE type = 'table' AND name = 'bosch_equipment'")
+    if not cursor.fetchone():
+        print("bosch_equipment table does not exist yet, skipping search index")
         return False
-    finally:
-        conn.close()
 
-@app.route('/api/malfunction-reports', methods=['GET'])
-def get_malfunction_reports():
-    try:
-        conn = get_db_connection()
-        if not conn:
-            return jsonify({"error": "Database connection failed"}), 500
-        
-        cursor = conn.cursor()
-        cursor.execute("SELECT * FROM malfunction_reports")
-        
-        # Convert the result to a list of dictionaries
-        columns = [column[0] for column in cursor.description]
-        reports = [dict(zip(columns, row)) for row in cursor.fetchall()]
-        
-        return jsonify({"malfunction_reports": reports}), 200
-    except Exception as e:
-        print(f"Error getting malfunction reports: {str(e)}")
-        return jsonify({"error": str(e)}), 500
-    finally:
-        if conn:
-            conn.close()
+    quoted_columns = ', '.join(f'"{column}"' for column in SEARCH_COLUMNS)
+    new_values = ', '.join(f'new."{column}"' for column in SEARCH_COLUMNS)
+    old_values = ', '.join(f'old."{column}"' for column in SEARCH_COLUMNS)
 
-@app.route('/api/malfunction-reports', methods=['POST'])
-def create_malfunction_report():
-    try:
-        # Get the report data from the request
-        report_data = request.json
-        print("Received malfunction report data:", report_data)
-        
-        if not report_data or 'toolId' not in report_data or 'description' not in report_data:
-            return jsonify({"error": "Invalid report data or missing required fields"}), 400
-        
-        # Connect to the database
-        conn = get_db_connection()
-        if not conn:
-            return jsonify({"error": "Database connection failed"}), 500
-        
-        # Check if a report already exists for this tool
+    # External content table: the index stores only tokens, rows are read from bosch_equipment.
+    # '-', '.', '/' and '#' are kept inside tokens so model numbers and ranges stay searchable.
+    cursor.execute("SELECT name FROM sqlite_master WHERE name = 'equipment_search'")
+    index_exists = cursor.fetchone() is not None
+    conn.execute(f'''
+        CREATE VIRTUAL TABLE IF NOT EXISTS equipment_search USING fts5(
+            {quoted_columns},
+            content='bosch_equipment',
+            content_rowid='index',
+            tokenize="unicode61 tokenchars '-./#'"
+        )
+    ''')
+
+    conn.execute(f'''
+        CREATE TRIGGER IF NOT EXISTS bosch_equipment_search_insert
+        AFTER INSERT ON bosch_equipment BEGIN
+            INSERT INTO equipment_search(rowid, {quoted_columns})
+            VALUES (new."index", {new_values});
+        END
+    ''')
+    conn.execute(f'''
+        CREATE TRIGGER IF NOT EXISTS bosch_equipment_search_delete
+        AFTER DELETE ON bosch_equipment BEGIN
+            INSERT INTO equipment_search(equipment_search, rowid, {quoted_columns})
+            VALUES ('delete', old."index", {old_values});
+        END
+    ''')
+    # Only writes to the indexed columns re-index the row, not e.g. a pic reassignment
+    conn.execute(f'''
+        CREATE TRIGGER IF NOT EXISTS bosch_equipment_search_update
+        AFTER UPDATE OF {quoted_columns} ON bosch_equipment BEGIN
+            INSERT INTO equipment_search(equipment_search, rowid, {quoted_columns})
+            VALUES ('delete', old."index", {old_values});
+            INSERT INTO equipment_search(rowid, {quoted_columns})
+            VALUES (new."index", {new_values});
+        END
+    ''')
+
+    # Index rows that were loaded before the index (or its triggers) existed
+    if rebuild or not index_exists:
+        conn.execute("INSERT INTO equipment_search(equipment_search) VALUES ('rebuild')")
+
+    print("Equipment search index created or already exists")
+    return True
+
+# Month abbreviations in the order of their number, for parsing dates in SQL
+MONTH_ABBREVIATIONS = 'JANFEBMARAPRMAYJUNJULAUGSEPOCTNOVDEC'
+
+def due_date_sql(column):
+    """
+    SQL expression turning a dataset date in column into an ISO date
+    (YYYY-MM-DD), or NULL when it cannot be parsed:
+    - 12-Oct-24 -> 2024-10-12
+    - 28-11-25 -> 2025-11-28
+    - 06-Jun-2025 -> 2025-06-06
+    - 31-Feb-25 -> NULL (no such day)
+    """
+    value = f"trim({column})"
+    day = f"substr({value}, 1, instr({value}, '-') - 1)"
+    rest = f"substr({value}, instr({value}, '-') + 1)"
+    month = f"substr({rest}, 1, instr({rest}, '-') - 1)"
+    year = f"substr({rest}, instr({rest}, '-') + 1)"
+    month_position = f"instr('{MONTH_ABBREVIATIONS}', upper({month}))"
+    month_number = f"""CASE
+        WHEN {month} GLOB '[0-9]*' THEN CAST({month} AS INTEGER)
+        WHEN length({month}) = 3 AND {month_position} % 3 = 1 THEN ({month_position} + 2) / 3
+    END"""
+    # Same pivot as date_parsing (and strptime's %y): 00-68 -> 2000s, 69-99 -> 1900s
+    year_number = f"""CASE length({year})
+        WHEN 2 THEN CAST({year} AS INTEGER) + CASE WHEN CAST({year} AS INTEGER) < 69 THEN 2000 ELSE 1900 END
+        WHEN 4 THEN CAST({year} AS INTEGER)
+    END"""
+    iso_date = f"printf('%04d-%02d-%02d', {year_number}, {month_number}, CAST({day} AS INTEGER))"
+    # Any date() modifier normalises impossible days (2025-02-31 -> 2025-03-03),
+    # so a round trip that changes the text means the date does not exist
+    return f"""CASE
+        WHEN {value} GLOB '[0-9]*-*-[0-9]*'
+            AND ({month_number}) BETWEEN 1 AND 12
+            AND CAST({day} AS INTEGER) BETWEEN 1 AND 31
+            AND ({year_number}) IS NOT NULL
+            AND date({iso_date}, '+0 days') = {iso_date}
+        THEN {iso_date}
+    END"""
+
+# Average month length in days, for the remaining-months calculation
+DAYS_PER_MONTH = 30.4375
+
+# Months until calibration__due as of today (negative when overdue), computed on read
+REMAINING_MONTHS_SQL = f"round((julianday(calibration_due_date) - julianday('now')) / {DAYS_PER_MONTH}, 1)"
+
+# Column loaded from the CSV that is replaced by REMAINING_MONTHS_SQL when read
+REMAINING_MONTHS_COLUMN = 'remaining_mths_before_calibration_due_date'
+
+def equipment_select_sql(cursor, alias=None):
+    """
+    Select list for every bosch_equipment column, with the remaining months
+    computed from the due date rather than the stale value loaded from the
+    CSV. alias qualifies the columns (e.g. 'e' in a join).
+    """
+    prefix = f'{alias}.' if alias else ''
+    # Generated columns are only listed by table_xinfo
+    columns = [column[1] for column in cursor.execute("PRAGMA table_xinfo(bosch_equipment)").fetchall()]
+    if 'calibration_due_date' not in columns:
+        return f'{prefix}*'
+    remaining_months = REMAINING_MONTHS_SQL.replace('calibration_due_date', f'{prefix}calibration_due_date')
+    return ', '.join(
+        f'{remaining_months} AS {column}' if column == REMAINING_MONTHS_COLUMN else f'{prefix}"{column}"'
+        for column in columns
+    )
+
+def remaining_months(due_text):
+    # REMAINING_MONTHS_SQL for a calibration__due value outside the database (history states)
+    due_date = parse_date(due_text) if isinstance(due_text, str) else None
+    if due_date is None:
+        return None
+    now = datetime.datetime.now(datetime.timezone.utc).replace(tzinfo=None)
+    days = (datetime.datetime.combine(due_date, datetime.time()) - now).total_seconds() / 86400
+    return round(days / DAYS_PER_MONTH, 1)
+
+def create_due_date_column(conn):
+    """
+    Add calibration_due_date, a virtual generated column holding
+    calibration__due as an ISO date, plus indexes on it (alone and after
+    pic and calibrator, for the schedule exports). Replacing
+    bosch_equipment (create-and-load, import) drops them, so this runs
+    again after every reload, in the caller's transaction (the caller commits).
+    """
+    cursor = conn.cursor()
+    cursor.execute("SELECT name FROM sqlite_master WHERE type = 'table' AND name = 'bosch_equipment'")
+    if not cursor.fetchone():
+        print("bosch_equipment table does not exist yet, skipping due date column")
+        return False
+
+    # Generated columns are only listed by table_xinfo
+    columns = [column[1] for column in cursor.execute("PRAGMA table_xinfo(bosch_equipment)").fetchall()]
+    if 'calibration_due_date' not in columns:
+        conn.execute(f'''
+            ALTER TABLE bosch_equipment ADD COLUMN calibration_due_date TEXT
+            GENERATED ALWAYS AS ({due_date_sql('calibration__due')}) VIRTUAL
+        ''')
+    conn.execute(
+        "CREATE INDEX IF NOT EXISTS idx_bosch_equipment_due_date ON bosch_equipment(calibration_due_date)"
+    )
+    # Per-worker and per-calibrator schedules, read in due date order
+    conn.execute(
+        "CREATE INDEX IF NOT EXISTS idx_bosch_equipment_pic_due ON bosch_equipment(pic, calibration_due_date)"
+    )
+    conn.execute(
+        "CREATE INDEX IF NOT EXISTS idx_bosch_equipment_calibrator_due ON bosch_equipment(calibrator, calibration_due_date)"
+    )
+    return True
+
+# Timestamps of bosch_equipment_history, in UTC like change_log.changed_at
+HISTORY_TIME_FORMAT = '%Y-%m-%dT%H:%M:%S'
+
+def format_history_time(moment):
+    # 2025-06-06T08:00:00.123Z from a naive UTC datetime
+    return f"{moment.strftime(HISTORY_TIME_FORMAT)}.{moment.microsecond // 1000:03d}Z"
+
+def history_timestamp():
+    return format_history_time(datetime.datetime.now(datetime.timezone.utc).replace(tzinfo=None))
+
+def parse_history_time(text):
+    """
+    Turn ?at= into a bosch_equipment_history timestamp, or None when it is
+    not a time:
+    - 2025-06-06T08:00:00, 2025-06-06T08:00:00+08:00, 2025-06-06T00:00:00Z (UTC when no offset)
+    - a date in any format parse_date reads, meaning the end of that day
+    """
+    text = (text or '').strip()
+    moment = None
+    if 'T' in text or ' ' in text:
+        try:
+            moment = datetime.datetime.fromisoformat(text.replace('Z', '+00:00'))
+        except ValueError:
+            moment = None
+    if moment is None:
+        day = parse_date(text)
+        if day is None:
+            return None
+        moment = datetime.datetime.combine(day, datetime.time.max)
+    if moment.tzinfo:
+        moment = moment.astimezone(datetime.timezone.utc).replace(tzinfo=None)
+    return format_history_time(moment)
+
+def equipment_state_sql(cursor):
+    """
+    json_object(...) of a bosch_equipment row's stored columns, the state kept
+    in bosch_equipment_history. table_info leaves out calibration_due_date,
+    which is generated from calibration__due and so needs no copy.
+    """
+    columns = [
+        column[1] for column in cursor.execute("PRAGMA table_info(bosch_equipment)").fetchall()
+        if column[1] != 'index'
+    ]
+    pairs = ', '.join(
+        "'{}', \"{}\"".format(column.replace("'", "''"), column.replace('"', '""'))
+        for column in columns
+    )
+    return f"json_object({pairs})"
+
+def history_insert_sql(cursor, where):
+    """
+    INSERT appending the current state of the bosch_equipment rows matching
+    where, with parameters (valid_from, operation, *where parameters)
+    """
+    return f'''
+        INSERT INTO bosch_equipment_history (row_id, valid_from, operation, state)
+        SELECT "index", ?, ?, {equipment_state_sql(cursor)} FROM bosch_equipment WHERE {where}
+    '''
+
+def record_history(cursor, operation, where, params=()):
+    """
+    Append the state of the bosch_equipment rows matching where to the
+    history. Like record_change, call it with the cursor of the write, after
+    the write and before commit, so the row and its history stay atomic.
+    """
+    cursor.execute(history_insert_sql(cursor, where), (history_timestamp(), operation, *params))
+
+# Latest version of the tools at :at, walking at most :ids tool ids after
+# :after (-1 for all of them). The recursive CTE walks the distinct row ids
+# with one index seek each (a loose index scan) and each tool's version is
+# another seek on (row_id, valid_from), so the cost grows with the number of
+# tools walked, not with the length of the history. SQLite may materialize the
+# CTE, so :ids is what bounds a page, not an outer LIMIT. Every walked id
+# gives a row: the state is NULL for tools deleted by :at or created after
+# it, and a last row with a NULL row_id marks the end of the ids.
+HISTORY_AS_OF_SQL = '''
+    WITH RECURSIVE ids(row_id) AS (
+        SELECT MIN(row_id) FROM bosch_equipment_history WHERE row_id > :after
+        UNION ALL
+        SELECT (SELECT MIN(row_id) FROM bosch_equipment_history WHERE row_id > ids.row_id)
+        FROM ids WHERE ids.row_id IS NOT NULL
+        LIMIT :ids
+    )
+    SELECT ids.row_id, h.valid_from, h.operation, h.state
+    FROM ids LEFT JOIN bosch_equipment_history h ON h.seq = (
+        SELECT seq FROM bosch_equipment_history
+        WHERE row_id = ids.row_id AND valid_from <= :at
+        ORDER BY valid_from DESC, seq DESC LIMIT 1
+    )
+'''
+
+def seed_history(cursor):
+    """
+    Record a freshly (re)loaded bosch_equipment table in the history: tools
+    that are no longer in it get a delete version, every row gets a reload
+    version
+    """
+    valid_from = history_timestamp()
+    cursor.execute(f'''
+        INSERT INTO bosch_equipment_history (row_id, valid_from, operation, state)
+        SELECT row_id, :at, 'delete', NULL FROM ({HISTORY_AS_OF_SQL})
+        WHERE state IS NOT NULL AND row_id NOT IN (SELECT "index" FROM bosch_equipment)
+    ''', {"at": valid_from, "after": -1, "ids": -1})
+    cursor.execute(history_insert_sql(cursor, "1"), (valid_from, 'reload'))
+
+# Schema migrations, applied in order at startup. The applied version is kept in
+# PRAGMA user_version, so each step runs once per database file. Steps use
+# IF NOT EXISTS so databases created before versioning migrate cleanly.
+def migrate_base_tables(conn):
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS malfunction_reports (
+            id TEXT PRIMARY KEY,
+            tool_id TEXT NOT NULL,
+            tool_name TEXT NOT NULL,
+            serial_number TEXT NOT NULL,
+            severity TEXT NOT NULL,
+            description TEXT NOT NULL,
+            reported_at TEXT NOT NULL,
+            UNIQUE(tool_id)
+        )
+    ''')
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS date_selections (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            selected_date TEXT NOT NULL,
+            timestamp DATETIME DEFAULT CURRENT_TIMESTAMP
+        )
+    ''')
+
+def migrate_search_index(conn):
+    create_equipment_search_index(conn)
+
+def migrate_change_log(conn):
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS change_log (
+            seq INTEGER PRIMARY KEY AUTOINCREMENT,
+            table_name TEXT NOT NULL,
+            row_id TEXT,
+            operation TEXT NOT NULL,
+            changed_at TEXT NOT NULL DEFAULT (strftime('%Y-%m-%dT%H:%M:%fZ', 'now'))
+        )
+    ''')
+
+def migrate_due_date_column(conn):
+    create_due_date_column(conn)
+
+def migrate_wal_mode(conn):
+    # Persistent: readers and the writer stop blocking each other
+    conn.execute("PRAGMA journal_mode=WAL")
+
+def migrate_equipment_history(conn):
+    # Append-only: each write adds a version of the row, valid from its time
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS bosch_equipment_history (
+            seq INTEGER PRIMARY KEY AUTOINCREMENT,
+            row_id INTEGER NOT NULL,
+            valid_from TEXT NOT NULL,
+            operation TEXT NOT NULL,
+            state TEXT
+        )
+    ''')
+    # seq is the rowid, so the index also orders versions with the same valid_from
+    conn.execute(
+        "CREATE INDEX IF NOT EXISTS idx_equipment_history_row_valid ON bosch_equipment_history(row_id, valid_from)"
+    )
+    # Start from the tools loaded before the history existed
+    has_equipment = conn.execute(
+        "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'bosch_equipment'"
+    ).fetchone()
+    has_history = conn.execute("SELECT 1 FROM bosch_equipment_history LIMIT 1").fetchone()
+    if has_equipment and not has_history:
+        seed_history(conn.cursor())
+
+def migrate_schedule_indexes(conn):
+    # The (pic / calibrator, due date) indexes added to create_due_date_column
+    create_due_date_column(conn)
+
+def migrate_due_date_validation(conn):
+    # Regenerate calibration_due_date with the 69 year pivot and impossible
+    # dates as NULL; a generated column cannot be altered, and its indexes
+    # must go before it can be dropped
+    columns = [column[1] for column in conn.execute("PRAGMA table_xinfo(bosch_equipment)").fetchall()]
+    if 'calibration_due_date' in columns:
+        for index in ['idx_bosch_equipment_due_date', 'idx_bosch_equipment_pic_due', 'idx_bosch_equipment_calibrator_due']:
+            conn.execute(f"DROP INDEX IF EXISTS {index}")
+        conn.execute("ALTER TABLE bosch_equipment DROP COLUMN calibration_due_date")
+    create_due_date_column(conn)
+
+def migrate_search_update_trigger(conn):
+    # Recreate the update trigger limited to the search columns
+    conn.execute("DROP TRIGGER IF EXISTS bosch_equipment_search_update")
+    create_equipment_search_index(conn)
+
+SCHEMA_MIGRATIONS = [
+    (1, migrate_base_tables),
+    (2, migrate_search_index),
+    (3, migrate_change_log),
+    (4, migrate_due_date_column),
+    (5, migrate_wal_mode),
+    (6, migrate_equipment_history),
+    (7, migrate_schedule_indexes),
+    (8, migrate_due_date_validation),
+    (9, migrate_search_update_trigger),
+]
+
+# Migrations that cannot run inside a transaction (journal mode changes)
+NON_TRANSACTIONAL_MIGRATIONS = {migrate_wal_mode}
+
+# How long a worker waits for another one that is migrating the same database
+MIGRATION_LOCK_TIMEOUT_SECONDS = 600
+
+def migrate_database(plant=None):
+    """
+    Bring the database schema of a plant (the default plant if not given) up
+    to the latest version.
+    Returns the schema version after migrating.
+    """
+    conn = get_db_connection(plant or DEFAULT_PLANT)
+    if not conn:
+        raise RuntimeError(f"Database connection failed during migration of plant {plant}")
+
+    busy_timeout = conn.execute("PRAGMA busy_timeout").fetchone()[0]
+    try:
+        # Every gunicorn worker migrates on startup: a step and its version
+        # bump commit together under the write lock, and the version is read
+        # again once the lock is held, so each step runs exactly once
+        conn.execute(f"PRAGMA busy_timeout = {MIGRATION_LOCK_TIMEOUT_SECONDS * 1000}")
+        for target_version, migration in SCHEMA_MIGRATIONS:
+            if conn.execute("PRAGMA user_version").fetchone()[0] >= target_version:
+                continue
+            if migration in NON_TRANSACTIONAL_MIGRATIONS:
+                # Cannot run inside a transaction; idempotent, so it may run twice
+                migration(conn)
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                version = conn.execute("PRAGMA user_version").fetchone()[0]
+                if target_version > version:
+                    print(f"Migrating database schema to version {target_version} ({migration.__name__})")
+                    if migration not in NON_TRANSACTIONAL_MIGRATIONS:
+                        migration(conn)
+                    conn.execute(f"PRAGMA user_version = {target_version}")
+                conn.commit()
+            except BaseException:
+                conn.rollback()
+                raise
+        return conn.execute("PRAGMA user_version").fetchone()[0]
+    finally:
+        # Back to the pool's wait for whoever checks the connection out next
+        conn.execute(f"PRAGMA busy_timeout = {busy_timeout}")
+        conn.close()
+
+def record_change(cursor, table_name, row_id, operation):
+    """
+    Append an entry to the change log. Call this with the cursor of the write
+    it describes, before commit, so the change and its log entry are atomic.
+    - operation is 'insert', 'update', 'delete' or 'reload' (whole table replaced)
+    """
+    cursor.execute(
+        "INSERT INTO change_log (table_name, row_id, operation) VALUES (?, ?, ?)",
+        (table_name, None if row_id is None else str(row_id), operation)
+    )
+
+@api.route('/api/malfunction-reports', methods=['GET'])
+def get_malfunction_reports():
+    try:
+        conn = get_read_connection()
+        if not conn:
+            return jsonify({"error": "Database connection failed"}), 500
+        
+        cursor = conn.cursor()
+        cursor.execute("SELECT * FROM malfunction_reports")
+        
+        # Convert the result to a list of dictionaries
+        columns = [column[0] for column in cursor.description]
+        reports = [dict(zip(columns, row)) for row in cursor.fetchall()]
+        
+        return jsonify({"malfunction_reports": reports}), 200
+    except Exception as e:
+        print(f"Error getting malfunction reports: {str(e)}")
+        return jsonify({"error": str(e)}), 500
+    finally:
+        if conn:
+            conn.close()
+
+@api.route('/api/malfunction-reports', methods=['POST'])
+def create_malfunction_report():
+    try:
+        # Get the report data from the request
+        report_data = request.json
+        print("Received malfunction report data:", report_data)
+        
+        if not report_data or 'toolId' not in report_data or 'description' not in report_data:
+            return jsonify({"error": "Invalid report data or missing required fields"}), 400
+        
+        # Connect to the database
+        conn = get_db_connection()
+        if not conn:
+            return jsonify({"error": "Database connection failed"}), 500
+        
+        # Check if a report already exists for this tool
         cursor = conn.cursor()
         cursor.execute(
             "SELECT id FROM malfunction_reports WHERE tool_id = ?",
@@ -504,6 +1408,7 @@ def create_malfunction_report():
                 report_data['reportedAt']
             )
         )
+        record_change(cursor, 'malfunction_reports', report_id, 'insert')
         conn.commit()
         
         return jsonify({
@@ -518,7 +1423,7 @@ def create_malfunction_report():
         if conn:
             conn.close()
 
-@app.route('/api/malfunction-reports/<report_id>', methods=['PUT'])
+@api.route('/api/malfunction-reports/<report_id>', methods=['PUT'])
 def update_malfunction_report(report_id):
     try:
         # Get the report data from the request
@@ -547,12 +1452,14 @@ def update_malfunction_report(report_id):
                 report_id
             )
         )
-        conn.commit()
         
         # Check if any rows were affected
         if cursor.rowcount == 0:
             return jsonify({"error": f"No report found with ID {report_id}"}), 404
         
+        record_change(cursor, 'malfunction_reports', report_id, 'update')
+        conn.commit()
+        
         return jsonify({
             "status": "success",
             "message": "Malfunction report updated successfully",
@@ -565,7 +1472,7 @@ def update_malfunction_report(report_id):
         if conn:
             conn.close()
 
-@app.route('/api/malfunction-reports/<report_id>', methods=['DELETE'])
+@api.route('/api/malfunction-reports/<report_id>', methods=['DELETE'])
 def delete_malfunction_report(report_id):
     try:
         # Connect to the database
@@ -579,12 +1486,14 @@ def delete_malfunction_report(report_id):
             "DELETE FROM malfunction_reports WHERE id = ?",
             (report_id,)
         )
-        conn.commit()
         
         # Check if any rows were affected
         if cursor.rowcount == 0:
             return jsonify({"error": f"No report found with ID {report_id}"}), 404
         
+        record_change(cursor, 'malfunction_reports', report_id, 'delete')
+        conn.commit()
+        
         return jsonify({
             "status": "success",
             "message": "Malfunction report deleted successfully"
@@ -596,11 +1505,233 @@ def delete_malfunction_report(report_id):
         if conn:
             conn.close()
 
+# Primary key column of each table tracked by the change log
+CHANGE_LOG_KEYS = {
+    'bosch_equipment': '"index"',
+    'malfunction_reports': 'id',
+}
+
+def fetch_changes(conn, since, limit=500):
+    """
+    Return (latest_seq, changes) for change log entries after `since`.
+    Several changes to the same row are collapsed into the latest one, and each
+    change carries the current row (None once the row has been deleted), so
+    clients only receive the rows that were modified.
+    """
+    cursor = conn.cursor()
+    cursor.execute(
+        "SELECT seq, table_name, row_id, operation, changed_at FROM change_log WHERE seq > ? ORDER BY seq LIMIT ?",
+        (since, limit)
+    )
+    entries = cursor.fetchall()
+    if not entries:
+        return since, []
+
+    # Keep only the latest entry per row
+    latest = {}
+    for seq, table_name, row_id, operation, changed_at in entries:
+        latest[(table_name, row_id)] = {
+            "seq": seq,
+            "table": table_name,
+            "row_id": row_id,
+            "operation": operation,
+            "changed_at": changed_at,
+            "row": None
+        }
+
+    # Fetch the current version of the changed rows, one query per table
+    for table_name, key_column in CHANGE_LOG_KEYS.items():
+        row_ids = [row_id for (name, row_id) in latest if name == table_name and row_id is not None]
+        if not row_ids:
+            continue
+        select_list = equipment_select_sql(cursor) if table_name == 'bosch_equipment' else '*'
+        for start in range(0, len(row_ids), 500):
+            chunk = row_ids[start:start + 500]
+            placeholders = ', '.join('?' for _ in chunk)
+            cursor.execute(
+                f"SELECT {key_column} AS change_key, {select_list} FROM {table_name} WHERE {key_column} IN ({placeholders})",
+                chunk
+            )
+            columns = [column[0] for column in cursor.description]
+            for row in cursor.fetchall():
+                record = dict(zip(columns, row))
+                change = latest.get((table_name, str(record.pop('change_key'))))
+                if change and change['operation'] != 'delete':
+                    # Map 'index' to 'id' for frontend compatibility
+                    if 'index' in record:
+                        record['id'] = record['index']
+                    change['row'] = record
+
+    changes = sorted(latest.values(), key=lambda change: change['seq'])
+    return entries[-1][0], changes
+
+@api.route('/api/changes', methods=['GET'])
+def get_changes():
+    conn = None
+    try:
+        since = request.args.get('since', 0, type=int)
+        limit = min(max(request.args.get('limit', 500, type=int), 1), 5000)
+
+        conn = get_read_connection()
+        if not conn:
+            return jsonify({"error": "Database connection failed"}), 500
+
+        latest_seq, changes = fetch_changes(conn, since, limit)
+        return jsonify({
+            "since": since,
+            "latest": latest_seq,
+            "changes": changes
+        }), 200
+
+    except Exception as e:
+        print(f"Error getting changes: {str(e)}")
+        return jsonify({"error": str(e)}), 500
+    finally:
+        if conn:
+            conn.close()
+
+@api.route('/api/changes/stream', methods=['GET'])
+def stream_changes():
+    # Resume from the last event the browser saw after a reconnect
+    since = request.headers.get('Last-Event-ID', type=int)
+    if since is None:
+        since = request.args.get('since', 0, type=int)
+    poll_interval = min(max(request.args.get('interval', 1.0, type=float), 0.2), 30.0)
+    plant = get_plant()
+
+    def generate():
+        last_seq = since
+        last_sent = time.monotonic()
+        conn = get_read_connection(plant)
+        if not conn:
+            yield f"event: error\ndata: {json.dumps({'error': 'Database connection failed'})}\n\n"
+            return
+        try:
+            yield "retry: 3000\n\n"
+            while True:
+                latest_seq, changes = fetch_changes(conn, last_seq)
+                # End the read transaction so the next poll sees new commits
+                conn.rollback()
+                for change in changes:
+                    yield f"id: {change['seq']}\nevent: change\ndata: {json.dumps(change, default=str)}\n\n"
+                if changes:
+                    last_seq = latest_seq
+                    last_sent = time.monotonic()
+                elif time.monotonic() - last_sent > 15:
+                    # Comment line keeps proxies from closing an idle stream
+                    yield ": keep-alive\n\n"
+                    last_sent = time.monotonic()
+                time.sleep(poll_interval)
+        finally:
+            conn.close()
+
+    return Response(
+        stream_with_context(generate()),
+        mimetype='text/event-stream',
+        headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'}
+    )
+
+def history_version(row):
+    row_id, valid_from, operation, state = row
+    if state is not None:
+        state = json.loads(state)
+        # As of today, like the live rows, not the value stored at the time
+        if REMAINING_MONTHS_COLUMN in state:
+            state[REMAINING_MONTHS_COLUMN] = remaining_months(state.get('calibration__due'))
+    return {
+        "id": row_id,
+        "valid_from": valid_from,
+        "operation": operation,
+        "state": state
+    }
+
+@api.route('/api/tools/as-of', methods=['GET'])
+def get_tools_as_of():
+    """
+    State of the tools at a past time (?at=): one tool with ?id=, else all
+    tools that existed then, ?limit= at a time in id order, continuing
+    after the id in next_after
+    """
+    conn = None
+    try:
+        at = parse_history_time(request.args.get('at'))
+        if at is None:
+            return jsonify({"error": "at must be a date or an ISO date-time"}), 400
+        tool_id = request.args.get('id', type=int)
+        after = request.args.get('after', -1, type=int)
+        limit = min(max(request.args.get('limit', 1000, type=int), 1), 5000)
+
+        conn = get_read_connection()
+        if not conn:
+            return jsonify({"error": "Database connection failed"}), 500
+
+        cursor = conn.cursor()
+        if tool_id is not None:
+            cursor.execute('''
+                SELECT row_id, valid_from, operation, state FROM bosch_equipment_history
+                WHERE row_id = ? AND valid_from <= ?
+                ORDER BY valid_from DESC, seq DESC LIMIT 1
+            ''', (tool_id, at))
+            row = cursor.fetchone()
+            if row is None:
+                return jsonify({"error": f"No history for tool {tool_id} at {at}"}), 404
+            return jsonify({"at": at, "tool": history_version(row)}), 200
+
+        # Only tools that existed at :at count towards the limit: walk the ids
+        # limit at a time until the page is full or the ids run out
+        tools = []
+        walked = after
+        while walked is not None and len(tools) < limit:
+            rows = cursor.execute(HISTORY_AS_OF_SQL, {"at": at, "after": walked, "ids": limit}).fetchall()
+            walked = rows[-1][0] if rows else None
+            tools.extend(history_version(row) for row in rows if row[3] is not None)
+        tools = tools[:limit]
+        return jsonify({
+            "at": at,
+            "tools": tools,
+            "next_after": tools[-1]["id"] if len(tools) == limit else None
+        }), 200
+
+    except Exception as e:
+        print(f"Error getting tools as of a time: {str(e)}")
+        return jsonify({"error": str(e)}), 500
+    finally:
+        if conn:
+            conn.close()
+
+@api.route('/api/tools/<int:tool_id>/history', methods=['GET'])
+def get_tool_history(tool_id):
+    # Every version of one tool, oldest first
+    conn = None
+    try:
+        conn = get_read_connection()
+        if not conn:
+            return jsonify({"error": "Database connection failed"}), 500
+
+        cursor = conn.cursor()
+        cursor.execute('''
+            SELECT row_id, valid_from, operation, state FROM bosch_equipment_history
+            WHERE row_id = ? ORDER BY valid_from, seq
+        ''', (tool_id,))
+        versions = [history_version(row) for row in cursor.fetchall()]
+        if not versions:
+            return jsonify({"error": f"No history for tool {tool_id}"}), 404
+        return jsonify({"id": tool_id, "versions": versions}), 200
+
+    except Exception as e:
+        print(f"Error getting tool history: {str(e)}")
+        return jsonify({"error": str(e)}), 500
+    finally:
+        if conn:
+            conn.close()
+
 # get the count only for 1st graph
-@app.route('/api/worker-allocation', methods=['GET'])
+@api.route('/api/worker-allocation', methods=['GET'])
 def get_worker_allocation():
+    import pandas as pd
+
     try:
-        conn = get_db_connection()
+        conn = get_analytics_connection()
         if not conn:
             return jsonify({"error": "Database connection failed"}), 500
 
@@ -628,69 +1759,332 @@ def get_worker_allocation():
         if conn:
             conn.close()
 
-@app.route('/api/optimize-worker-allocation', methods=['GET'])      # graph
+def read_allocation_snapshot(conn):
+    """
+    Read the data the allocation engines work on into an AllocationSnapshot:
+    workers, calibration_items (CalibrationItem records that unpack as
+    (calibrator, serial_no, calibration__due, old_workload) with the calibrator
+    and due date as integer codes) and current_workers[i], the pic currently
+    assigned to calibration_items[i]
+    """
+    import pandas as pd
+
+    # Fetch relevant data
+    query = "SELECT serial_no, pic, calibrator, calibration__due FROM bosch_equipment"
+    df = pd.read_sql_query(query, conn)
+
+    # Drop rows with missing essential values
+    df = df.dropna(subset=["serial_no", "pic"])
+
+    return encode_allocation_snapshot(df)
+
+def get_data_version(conn):
+    # Latest change log entry: every write to the allocation inputs adds one
+    return conn.execute("SELECT MAX(seq) FROM change_log").fetchone()[0]
+
+# Encoded snapshots by (plant, data version), shared by the optimize, sweep
+# and update endpoints while the data is unchanged
+allocation_snapshots = SingleFlightCache(
+    ttl=float(os.environ.get('ALLOCATION_CACHE_SECONDS', 30)), max_entries=len(PLANT_DATABASES) * 2
+)
+
+def load_allocation_snapshot(conn):
+    """
+    Returns (workers, calibration_items, current_workers) for the current
+    plant, from the snapshot cache when the data has not changed. workers is
+    a fresh list each call since the engines reorder it
+    """
+    key = (get_plant(), get_data_version(conn))
+    snapshot, _ = allocation_snapshots.get_or_compute(key, lambda: read_allocation_snapshot(conn))
+    return list(snapshot.workers), snapshot.items, snapshot.current_workers
+
+# Upper limit for ?time_budget_ms= on the allocation endpoints
+MAX_TIME_BUDGET_MS = 60000
+
+def get_allocation_engine():
+    # Allocation engine selected with ?engine= (heuristic by default)
+    engine = request.args.get('engine', 'heuristic').lower()
+    if engine not in ALLOCATION_ENGINES:
+        raise ValueError(f"Unknown engine '{engine}', expected one of {ALLOCATION_ENGINES}")
+    return engine
+
+def get_time_budget_ms():
+    # Optional local-search budget from ?time_budget_ms=
+    time_budget_ms = request.args.get('time_budget_ms', type=int)
+    if time_budget_ms is not None and not 0 < time_budget_ms <= MAX_TIME_BUDGET_MS:
+        raise ValueError(f"time_budget_ms must be between 1 and {MAX_TIME_BUDGET_MS}")
+    return time_budget_ms
+
+def parse_allocation_weight(name, value):
+    """
+    Validate one SWEEP_PARAMETERS value, given as query string text or a JSON
+    number: a finite, non-negative number, and a whole one for the integer
+    parameters (min_workload, max_deviation). Raises ValueError otherwise.
+    """
+    kind = type(SWEEP_PARAMETERS[name])
+    expected = "a non-negative integer" if kind is int else "a non-negative number"
+    if isinstance(value, str):
+        try:
+            number = float(value.strip())
+        except ValueError:
+            raise ValueError(f"{name} must be {expected}, got '{value}'")
+    elif isinstance(value, (int, float)) and not isinstance(value, bool):
+        number = float(value)
+    else:
+        raise ValueError(f"{name} must be {expected}")
+    if not math.isfinite(number) or number < 0 or (kind is int and not number.is_integer()):
+        raise ValueError(f"{name} must be {expected}, got {value!r}")
+    return kind(number)
+
+def get_allocation_weights():
+    # Optional ?w1=&w2=&w3=&min_workload=&max_deviation=, defaulting to the model's weights
+    weights = {}
+    for name, default in SWEEP_PARAMETERS.items():
+        value = request.args.get(name)
+        weights[name] = default if value is None else parse_allocation_weight(name, value)
+    return weights
+
+def run_allocation_engine(engine, workers, calibration_items, current_workers, time_budget_ms=None, weights=None):
+    """
+    Run an allocation engine, optionally followed by local search, with the
+    given weights (SWEEP_PARAMETERS names; defaults when not given).
+    Returns (loads, assignments, details): loads are (worker_id, load) tuples,
+    assignments are (worker_id, serial_no) tuples, or None when the engine only
+    decides loads (the heuristic without local search), and details holds the
+    engine statistics for the response
+    """
+    weights = weights or dict(SWEEP_PARAMETERS)
+    details = {"engine": engine, "weights": weights}
+    if engine == 'optimal':
+        # Min-cost flow, warm-started from the current pic assignment
+        solution = solve_min_cost_allocation(workers, calibration_items, current_workers, **weights)
+        loads, assignments = solution["loads"], solution["assignments"]
+        details.update({
+            "moved_items": solution["moved"],
+            "cost": solution["cost"],
+            "iterations": solution["iterations"],
+            "solve_seconds": solution["seconds"]
+        })
+    else:
+        # Apply heuristic model
+        loads, assignments = apply_heuristic_model(workers, calibration_items, **weights), None
+        if time_budget_ms:
+            # Local search starts from the items mapped onto the heuristic's loads
+            assignments = assign_items_to_target_loads(workers, calibration_items, loads)
+
+    if time_budget_ms and assignments:
+        improved = improve_allocation(
+            workers, calibration_items, [worker_id for worker_id, _ in assignments], time_budget_ms,
+            w1=weights["w1"], w2=weights["w2"], w3=weights["w3"]
+        )
+        loads, assignments = improved["loads"], improved["assignments"]
+        details["local_search"] = {
+            "time_budget_ms": time_budget_ms,
+            "initial_score": improved["initial_score"],
+            "score": improved["score"],
+            "iterations": improved["iterations"],
+            "accepted": improved["accepted"],
+            "trajectory": improved["trajectory"]
+        }
+
+    return loads, assignments, details
+
+# Results of /api/optimize-worker-allocation, shared by concurrent identical
+# requests and reused for ALLOCATION_CACHE_SECONDS while the data is unchanged
+allocation_results = SingleFlightCache(ttl=float(os.environ.get('ALLOCATION_CACHE_SECONDS', 30)))
+
+def plan_worker_allocation(conn, engine, time_budget_ms, weights):
+    """
+    Run the allocation for the current plant and data. Returns (result,
+    data_version, cache status); result holds the engine details, the
+    optimized loads and the item reassignments, {"serial_no", "pic"} records
+    of the rows update-worker-allocation writes. Identical requests (same
+    plant, data version, engine, budget and weights) share one computation.
+    To apply exactly what a preview showed, clients post its reassignments
+    and data_version back to update-worker-allocation.
+    """
+    def optimize():
+        workers, calibration_items, current_workers = load_allocation_snapshot(conn)
+
+        print(f"[LOG] {datetime.datetime.now().isoformat()} - Processing {len(workers)} workers and {len(calibration_items)} calibration items with the {engine} engine")
+
+        optimized_allocation, item_assignments, details = run_allocation_engine(
+            engine, workers, calibration_items, current_workers, time_budget_ms, weights
+        )
+
+        print(f"[LOG] {datetime.datetime.now().isoformat()} - Optimization complete. Generated {len(optimized_allocation)} worker assignments")
+
+        if item_assignments is not None:
+            # Item-level results (optimal engine, local search): only rows whose pic changes are written
+            worker_assignments = [
+                (worker_id, serial_no)
+                for (worker_id, serial_no), current in zip(item_assignments, current_workers)
+                if worker_id != current
+            ]
+        elif optimized_allocation:
+            # apply_heuristic_model returns (worker_id, workload_count) tuples,
+            # so map each serial_no to a worker that matches the distribution
+            worker_assignments = assign_items_to_target_loads(workers, calibration_items, optimized_allocation)
+        else:
+            worker_assignments = []
+
+        # Prepare the optimized data to match serial_no and pic
+        details["optimized_worker_allocation"] = optimized_allocation
+        details["reassignments"] = [
+            {"serial_no": serial_no, "pic": worker_id} for worker_id, serial_no in worker_assignments
+        ]
+        details["workers_processed"] = len(workers)
+        details["items_processed"] = len(calibration_items)
+        return details
+
+    data_version = get_data_version(conn)
+    key = (get_plant(), data_version, engine, time_budget_ms, tuple(sorted(weights.items())))
+    result, cache_status = allocation_results.get_or_compute(key, optimize)
+    return result, data_version, cache_status
+
+@api.route('/api/optimize-worker-allocation', methods=['GET'])      # graph
 def optimize_worker_allocation():
+    conn = None
     try:
         print(f"[LOG] {datetime.datetime.now().isoformat()} - Optimize worker allocation endpoint called")
+
+        try:
+            engine = get_allocation_engine()
+            time_budget_ms = get_time_budget_ms()
+            weights = get_allocation_weights()
+        except ValueError as parameter_error:
+            return jsonify({"error": str(parameter_error)}), 400
         
         # Get worker allocation data directly from the database
-        conn = get_db_connection()
+        conn = get_analytics_connection()
         if not conn:
             print(f"[LOG] {datetime.datetime.now().isoformat()} - Database connection failed")
             return jsonify({"error": "Database connection failed"}), 500
 
-        # Fetch relevant data
-        query = "SELECT serial_no, pic, calibrator, calibration__due FROM bosch_equipment"
-        df = pd.read_sql_query(query, conn)
+        result, data_version, cache_status = plan_worker_allocation(conn, engine, time_budget_ms, weights)
 
-        # Drop rows with missing essential values
-        df = df.dropna(subset=["serial_no", "pic"])
+        response = dict(result, data_version=data_version, cache=cache_status)
+        return jsonify(response), 200
 
-        # Compute old_workload (count of serial_no per pic)
-        workload_df = df.groupby("pic")["serial_no"].count().reset_index()
-        workload_df.rename(columns={"serial_no": "old_workload"}, inplace=True)
+    except Exception as e:
+        error_message = str(e)
+        print(f"[LOG] {datetime.datetime.now().isoformat()} - Error in optimize worker allocation: {error_message}")
+        return jsonify({"error": error_message}), 500
+    finally:
+        if conn:
+            conn.close()
+        print(f"[LOG] {datetime.datetime.now().isoformat()} - Optimize worker allocation endpoint completed")
 
-        # Merge workload count with main dataframe
-        merged_df = df.merge(workload_df, on="pic", how="left")
-        
-        # Convert to dictionary for processing
-        data = merged_df.to_dict(orient="records")
-
-        # Extract unique workers and prepare calibration items
-        workers = list(set(item["pic"] for item in data))  # Unique workers
-        calibration_items = []
-        for item in data:
-            calibration_items.append((
-                item.get("calibrator", ""), 
-                item.get("serial_no", ""), 
-                item.get("calibration__due", ""), 
-                item.get("old_workload", 0)
-            ))
-        
-        print(f"[LOG] {datetime.datetime.now().isoformat()} - Processing {len(workers)} workers and {len(calibration_items)} calibration items")
+# Upper bound on the number of weight configurations one sweep may evaluate
+MAX_SWEEP_CONFIGURATIONS = 500
 
-        # Apply heuristic model
-        optimized_allocation = apply_heuristic_model(workers, calibration_items)
-        
-        print(f"[LOG] {datetime.datetime.now().isoformat()} - Optimization complete. Generated {len(optimized_allocation)} worker assignments")
+def parse_sweep_grid(data):
+    # Each SWEEP_PARAMETERS name may be given as a number or a list of numbers
+    grid = {}
+    for name, default in SWEEP_PARAMETERS.items():
+        values = data.get(name, [default])
+        if not isinstance(values, list):
+            values = [values]
+        if not values:
+            raise ValueError(f"{name} must be a number or a non-empty list of numbers")
+        # Same rules as the ?w1= ... parameters of the other allocation endpoints
+        grid[name] = [parse_allocation_weight(name, value) for value in values]
 
-        # Prepare the optimized data to match serial_no and pic
-        result = optimized_allocation
-        return jsonify({"optimized_worker_allocation": result}), 200
+    configurations = 1
+    for values in grid.values():
+        configurations *= len(values)
+    if configurations > MAX_SWEEP_CONFIGURATIONS:
+        raise ValueError(f"Grid has {configurations} configurations, the limit is {MAX_SWEEP_CONFIGURATIONS}")
+    return grid, configurations
+
+@api.route('/api/optimize-worker-allocation/sweep', methods=['POST'])
+def sweep_worker_allocation():
+    """
+    What-if sweep over the heuristic weights. Body, all optional:
+    {"w1": [2.0, 2.7], "w2": [...], "w3": [...], "min_workload": [...],
+     "max_deviation": [...], "max_workers": 4}
+    Returns every configuration's result and the Pareto front of workload
+    imbalance vs. location and deadline grouping
+    """
+    conn = None
+    try:
+        print(f"[LOG] {datetime.datetime.now().isoformat()} - Sweep worker allocation endpoint called")
+
+        data = request.get_json(silent=True) or {}
+        try:
+            grid, configurations = parse_sweep_grid(data)
+            max_workers = data.get('max_workers')
+            if max_workers is not None and (not isinstance(max_workers, int) or max_workers < 1):
+                raise ValueError("max_workers must be a positive integer")
+        except ValueError as parameter_error:
+            return jsonify({"error": str(parameter_error)}), 400
+
+        # Read the snapshot once; it is shipped to each pool process a single time
+        conn = get_analytics_connection()
+        workers, calibration_items, _ = load_allocation_snapshot(conn)
+        conn.close()
+        conn = None
+
+        if not workers:
+            return jsonify({"error": "No workers found"}), 404
+
+        print(f"[LOG] {datetime.datetime.now().isoformat()} - Sweeping {configurations} configurations over {len(calibration_items)} calibration items")
+
+        started = time.perf_counter()
+        results, front = sweep_heuristic_weights(workers, calibration_items, grid, max_workers)
+
+        return jsonify({
+            "configurations": configurations,
+            "results": results,
+            "pareto_front": front,
+            "seconds": round(time.perf_counter() - started, 3)
+        }), 200
 
     except Exception as e:
         error_message = str(e)
-        print(f"[LOG] {datetime.datetime.now().isoformat()} - Error in optimize worker allocation: {error_message}")
+        print(f"[LOG] {datetime.datetime.now().isoformat()} - Error in sweep worker allocation: {error_message}")
         return jsonify({"error": error_message}), 500
     finally:
         if conn:
             conn.close()
-        print(f"[LOG] {datetime.datetime.now().isoformat()} - Optimize worker allocation endpoint completed")
+        print(f"[LOG] {datetime.datetime.now().isoformat()} - Sweep worker allocation endpoint completed")
 
-@app.route('/api/update-worker-allocation', methods=['POST'])       # run model and update db
+def parse_previewed_allocation(data):
+    """
+    (worker_assignments, data_version) from an update-worker-allocation body
+    holding the "reassignments" and "data_version" that
+    optimize-worker-allocation returned
+    """
+    reassignments = data.get('reassignments')
+    if not isinstance(reassignments, list) or not all(
+        isinstance(move, dict) and isinstance(move.get('pic'), str) and move.get('serial_no') is not None
+        for move in reassignments
+    ):
+        raise ValueError('reassignments must be a list of {"serial_no", "pic"} records')
+    data_version = data.get('data_version')
+    if 'data_version' not in data or not (data_version is None or (isinstance(data_version, int) and not isinstance(data_version, bool))):
+        raise ValueError("data_version of the preview is required with reassignments")
+    return [(move['pic'], move['serial_no']) for move in reassignments], data_version
+
+@api.route('/api/update-worker-allocation', methods=['POST'])       # run model and update db
 def update_worker_allocation():
+    """
+    Write an allocation to bosch_equipment. The body should hold the
+    "reassignments" and "data_version" of an optimize-worker-allocation
+    preview, which are applied as previewed; without them the allocation is
+    computed here. Either way it is only written when the data is still at
+    that version, otherwise the response is 409.
+    """
+    conn = None
     try:
         print(f"[LOG] {datetime.datetime.now().isoformat()} - Update worker allocation endpoint called")
+
+        try:
+            engine = get_allocation_engine()
+            time_budget_ms = get_time_budget_ms()
+            weights = get_allocation_weights()
+        except ValueError as parameter_error:
+            return jsonify({"error": str(parameter_error)}), 400
         
         # Get optimized allocation data directly from the database
         conn = get_db_connection()
@@ -698,105 +2092,69 @@ def update_worker_allocation():
             print(f"[LOG] {datetime.datetime.now().isoformat()} - Database connection failed")
             return jsonify({"error": "Database connection failed"}), 500
 
-        # Fetch relevant data
-        query = "SELECT serial_no, pic, calibrator, calibration__due FROM bosch_equipment"
-        df = pd.read_sql_query(query, conn)
-
-        # Drop rows with missing essential values
-        df = df.dropna(subset=["serial_no", "pic"])
-
-        # Compute old_workload (count of serial_no per pic)
-        workload_df = df.groupby("pic")["serial_no"].count().reset_index()
-        workload_df.rename(columns={"serial_no": "old_workload"}, inplace=True)
+        data = request.get_json(silent=True) or {}
+        if 'reassignments' in data:
+            # The allocation the client previewed, applied as shown
+            try:
+                worker_assignments, data_version = parse_previewed_allocation(data)
+            except ValueError as body_error:
+                return jsonify({"error": str(body_error)}), 400
+            details = {"data_version": data_version, "cache": "previewed"}
+        else:
+            # No preview given: compute the allocation now
+            result, data_version, cache_status = plan_worker_allocation(conn, engine, time_budget_ms, weights)
+            details = dict(result, data_version=data_version, cache=cache_status)
 
-        # Merge workload count with main dataframe
-        merged_df = df.merge(workload_df, on="pic", how="left")
-        
-        # Convert to dictionary for processing
-        data = merged_df.to_dict(orient="records")
-
-        # Extract unique workers and prepare calibration items
-        workers = list(set(item["pic"] for item in data))  # Unique workers
-        calibration_items = []
-        for item in data:
-            calibration_items.append((
-                item.get("calibrator", ""), 
-                item.get("serial_no", ""), 
-                item.get("calibration__due", ""), 
-                item.get("old_workload", 0)
-            ))
-        
-        print(f"[LOG] {datetime.datetime.now().isoformat()} - Processing {len(workers)} workers and {len(calibration_items)} calibration items")
+            if not result["optimized_worker_allocation"]:
+                print(f"[LOG] {datetime.datetime.now().isoformat()} - No optimized data available")
+                return jsonify({"error": "No optimized data available"}), 500
 
-        # Apply heuristic model to get worker load distribution
-        optimized_worker_loads = apply_heuristic_model(workers, calibration_items)
-        if not optimized_worker_loads:
-            print(f"[LOG] {datetime.datetime.now().isoformat()} - No optimized data available")
-            return jsonify({"error": "No optimized data available"}), 500
-        
-        print(f"[LOG] {datetime.datetime.now().isoformat()} - Optimization complete. Generated worker load distribution")
-        
-        # Create a mapping of serial numbers to workers based on the optimized distribution
-        # This is needed because apply_heuristic_model returns (worker_id, workload_count) tuples
-        # but we need to map each serial_no to a worker for the database update
-        
-        print(f"[LOG] {datetime.datetime.now().isoformat()} - Creating worker assignments based on optimized distribution")
-        
-        # Convert optimized_worker_loads to a dictionary for easier access
-        target_workloads = {worker_id: load for worker_id, load in optimized_worker_loads}
-        
-        # Track current assignments to ensure we don't exceed target workloads
-        current_workloads = {worker_id: 0 for worker_id in workers}
-        
-        # Create assignments mapping serial numbers to workers
-        worker_assignments = []  # List of (worker_id, serial_no) tuples
-        
-        # First, group calibration items by calibrator and due date for better assignment
-        grouped_items = {}
-        for item in calibration_items:
-            calibrator, serial_no, due_date, _ = item
-            key = (calibrator, due_date)
-            if key not in grouped_items:
-                grouped_items[key] = []
-            grouped_items[key].append(serial_no)
-        
-        # Assign items to workers based on target workloads
-        for (calibrator, due_date), serial_numbers in grouped_items.items():
-            # Find workers who still need more items to reach their target
-            available_workers = [w for w in workers if current_workloads[w] < target_workloads.get(w, 0)]
-            
-            if not available_workers:
-                # If all workers have reached their targets, distribute remaining items evenly
-                available_workers = workers
-            
-            # Sort workers by how far they are from their target (ascending)
-            available_workers.sort(key=lambda w: target_workloads.get(w, 0) - current_workloads[w], reverse=True)
-            
-            # Assign serial numbers to workers
-            for serial_no in serial_numbers:
-                # Get the worker who needs the most items to reach target
-                best_worker = available_workers[0]
-                
-                # Add assignment
-                worker_assignments.append((best_worker, serial_no))
-                
-                # Update current workload
-                current_workloads[best_worker] += 1
-                
-                # Re-sort workers if there are more items to assign
-                if len(serial_numbers) > 1:
-                    available_workers.sort(key=lambda w: target_workloads.get(w, 0) - current_workloads[w], reverse=True)
+            worker_assignments = [(move["pic"], move["serial_no"]) for move in details.pop("reassignments")]
         
         print(f"[LOG] {datetime.datetime.now().isoformat()} - Created {len(worker_assignments)} worker assignments")
-        
-        # Now update the database with the new assignments
+
+        # The allocation only holds for the data it was computed on: check the
+        # version under the write lock, so no other write can slip in between
+        conn.execute("BEGIN IMMEDIATE")
+        current_version = get_data_version(conn)
+        if current_version != data_version:
+            conn.rollback()
+            print(f"[LOG] {datetime.datetime.now().isoformat()} - Data changed since the allocation was computed ({data_version} -> {current_version})")
+            return jsonify({
+                "error": "The data changed since the allocation was computed; optimize again",
+                "data_version": current_version
+            }), 409
+        
+        # Now update the database with the new assignments. They go into a temp
+        # table first, so that the update, its change feed entries and the new
+        # versions in the history each take one scan of bosch_equipment rather
+        # than one per reassigned row
         cursor = conn.cursor()
-        update_query = "UPDATE bosch_equipment SET pic = ? WHERE serial_no = ?"
-        
-        update_count = 0
-        for worker_id, serial_no in worker_assignments:
-            cursor.execute(update_query, (worker_id, serial_no))
-            update_count += 1
+        cursor.execute("DROP TABLE IF EXISTS temp.allocation_moves")
+        cursor.execute("CREATE TEMP TABLE allocation_moves (serial_no PRIMARY KEY, pic)")
+        # A serial number assigned twice keeps its last pic
+        cursor.executemany(
+            "INSERT OR REPLACE INTO temp.allocation_moves (serial_no, pic) VALUES (?, ?)",
+            [(serial_no, worker_id) for worker_id, serial_no in worker_assignments]
+        )
+        moved_rows = "serial_no IN (SELECT serial_no FROM temp.allocation_moves)"
+        
+        cursor.execute("""
+            UPDATE bosch_equipment SET pic = moves.pic
+            FROM temp.allocation_moves AS moves
+            WHERE bosch_equipment.serial_no = moves.serial_no
+        """)
+        update_count = len(worker_assignments)
+        
+        # Log every reassigned row in the change feed, in the same transaction
+        cursor.execute(f"""
+            INSERT INTO change_log (table_name, row_id, operation)
+            SELECT 'bosch_equipment', "index", 'update' FROM bosch_equipment WHERE {moved_rows}
+        """)
+        
+        # ... and its new version in the history
+        record_history(cursor, 'update', moved_rows)
+        cursor.execute("DROP TABLE temp.allocation_moves")
 
         conn.commit()
         
@@ -804,8 +2162,7 @@ def update_worker_allocation():
 
         return jsonify({
             "message": "Worker allocation updated successfully",
-            "workers_processed": len(workers),
-            "items_processed": len(calibration_items),
+            **details,
             "updates_applied": update_count
         }), 200
 
@@ -818,230 +2175,153 @@ def update_worker_allocation():
             conn.close()
         print(f"[LOG] {datetime.datetime.now().isoformat()} - Update worker allocation endpoint completed")
 
-def apply_heuristic_model(workers, calibration_items):
+# Queries of the cross-plant summary run in parallel, one task per plant
+plant_executor = ThreadPoolExecutor(max_workers=len(plant_pools), thread_name_prefix='plant')
+
+def summarize_plant(plant, due_days):
     """
-    Apply a heuristic model to optimize worker allocation based on:
-    1. Balancing workload among workers (highest priority)
-    2. Considering location grouping (calibrator) (higher priority)
-    3. Considering deadline grouping (calibration_due) (higher priority)
-    4. Ensuring each worker's workload is within ±5 tasks from average
-    
-    Returns a list of tuples (worker_id, optimized_load)
+    Counts for one plant's dashboard tiles: tools, overdue and due within
+    due_days, malfunction reports and tools per pic (workload).
+    Errors are reported in the result so one plant cannot fail the summary.
     """
-    if not workers or len(workers) == 0:
-        return []
-    
-    # Initialize worker tracking
-    worker_data = {
-        worker: {
-            'assigned_load': 0,
-            'locations': set(),
-            'deadlines': set()
-        } for worker in workers
+    conn = get_analytics_connection(plant)
+    if not conn:
+        return {"plant": plant, "error": "Database connection failed"}
+    try:
+        cursor = conn.cursor()
+        columns = [column[1] for column in cursor.execute("PRAGMA table_xinfo(bosch_equipment)").fetchall()]
+        summary = {"plant": plant, "tools": 0, "overdue": 0, "due_soon": 0, "malfunction_reports": 0, "workloads": {}}
+
+        if columns:
+            summary["tools"] = cursor.execute("SELECT COUNT(*) FROM bosch_equipment").fetchone()[0]
+            summary["workloads"] = {
+                pic or 'Unassigned': count
+                for pic, count in cursor.execute("SELECT pic, COUNT(*) FROM bosch_equipment GROUP BY pic")
+            }
+        if 'calibration_due_date' in columns:
+            summary["overdue"], summary["due_soon"] = cursor.execute(
+                """
+                SELECT
+                    COUNT(*) FILTER (WHERE calibration_due_date < date('now')),
+                    COUNT(*) FILTER (WHERE calibration_due_date >= date('now'))
+                FROM bosch_equipment
+                WHERE calibration_due_date < date('now', ?)
+                """,
+                (f"+{due_days} days",)
+            ).fetchone()
+        summary["malfunction_reports"] = cursor.execute("SELECT COUNT(*) FROM malfunction_reports").fetchone()[0]
+        return summary
+
+    except Exception as e:
+        print(f"Error summarizing plant {plant}: {str(e)}")
+        return {"plant": plant, "error": str(e)}
+    finally:
+        conn.close()
+
+@api.route('/api/plants', methods=['GET'])
+def list_plants():
+    return jsonify({"plants": list(plant_pools), "default": DEFAULT_PLANT}), 200
+
+@api.route('/api/plants/summary', methods=['GET'])
+def plants_summary():
+    """
+    Dashboard counts for every plant (or the plants listed in ?plants=a,b),
+    queried in parallel and merged into totals. ?due_days= sets the
+    due-soon window (default 30)
+    """
+    due_days = request.args.get('due_days', 30, type=int)
+    if due_days < 0:
+        return jsonify({"error": "due_days must be 0 or more"}), 400
+
+    plants = [plant for plant in request.args.get('plants', '').split(',') if plant] or list(plant_pools)
+    unknown = [plant for plant in plants if plant not in plant_pools]
+    if unknown:
+        return jsonify({"error": f"Unknown plants: {', '.join(unknown)}", "plants": list(plant_pools)}), 404
+
+    started = time.perf_counter()
+    summaries = list(plant_executor.map(lambda plant: summarize_plant(plant, due_days), plants))
+
+    totals = {"tools": 0, "overdue": 0, "due_soon": 0, "malfunction_reports": 0, "workloads": {}}
+    for summary in summaries:
+        if "error" in summary:
+            continue
+        for key in ("tools", "overdue", "due_soon", "malfunction_reports"):
+            totals[key] += summary[key]
+        for pic, count in summary["workloads"].items():
+            totals["workloads"][pic] = totals["workloads"].get(pic, 0) + count
+
+    return jsonify({
+        "due_days": due_days,
+        "totals": totals,
+        "plants": summaries,
+        "seconds": round(time.perf_counter() - started, 4)
+    }), 200
+
+@api.route('/api/health', methods=['GET'])
+def health():
+    # Report the schema version of each plant and how long the worker took to start
+    schema_versions = current_app.config.get('SCHEMA_VERSIONS', {})
+    return jsonify({
+        "status": "ok",
+        "schema_version": schema_versions.get(DEFAULT_PLANT),
+        "plants": {
+            plant: {
+                "schema_version": schema_versions.get(plant),
+                "pool": pool.stats(),
+                "read_pool": plant_read_pools[plant].stats(),
+                "analytics_snapshot": plant_snapshots[plant].stats() if plant in plant_snapshots else None
+            }
+            for plant, pool in plant_pools.items()
+        },
+        "startup": current_app.config.get('STARTUP_TIMINGS'),
+        "date_selection_buffer": date_selection_buffer.stats(),
+        "date_parse_cache": date_cache_stats(),
+        "allocation_cache": allocation_results.stats(),
+        "allocation_snapshot_cache": allocation_snapshots.stats()
+    }), 200
+
+def create_app():
+    """
+    Build the Flask app: register the routes and run the schema migration of
+    every plant once, before the first request. Heavy libraries are not
+    imported here.
+    Serve with `python main.py` or e.g. `gunicorn "main:create_app()"`.
+    """
+    started = time.perf_counter()
+
+    app = Flask(__name__)
+    # Simple CORS configuration
+    CORS(app)
+    app.register_blueprint(api)
+
+    schema_versions = {plant: migrate_database(plant) for plant in plant_pools}
+
+    # Start the date selection writer and flush whatever is queued on shutdown
+    date_selection_buffer.start()
+    atexit.register(date_selection_buffer.stop)
+
+    # Take the first analytics snapshots now, then refresh them in the background
+    for snapshot in plant_snapshots.values():
+        try:
+            snapshot.refresh()
+        except Exception as e:
+            # Served from live data until a background refresh succeeds
+            print(f"Error taking the first {snapshot.name} snapshot: {e}")
+        snapshot.start()
+        atexit.register(snapshot.stop)
+
+    ready = time.perf_counter()
+    timings = {
+        "import_seconds": round(started - IMPORT_STARTED, 4),
+        "startup_seconds": round(ready - started, 4),
+        "total_seconds": round(ready - IMPORT_STARTED, 4)
     }
-    
-    # Current workloads
-    workloads = {worker: 0 for worker in workers}
-    
-    # Group tasks by location and deadline
-    task_groups = {}
-    for item in calibration_items:
-        calibrator, serial_no, due_date, _ = item
-        key = (calibrator, due_date)
-        if key not in task_groups:
-            task_groups[key] = []
-        task_groups[key].append(item)
-    
-    # Heuristic weights
-    w1 = 2.7  # Workload balancing (highest priority)
-    w2 = 2.0  # Location grouping (higher priority)
-    w3 = 2.3  # Deadline grouping (higher priority)
-    
-    # Function to get average workload
-    def get_avg_workload():
-        return int(sum(workloads.values()) / max(len(workloads), 1))
-    
-    # Heuristic function to score workers for a task
-    def heuristic(worker, location, due_date):
-        avg_workload = get_avg_workload()
-        
-        # Workload penalty: Higher deviation = higher penalty
-        workload_penalty = abs(workloads[worker] - avg_workload)
-        
-        # Location penalty: Prefer same location
-        location_penalty = 0 if location in worker_data[worker]['locations'] else 1
-        
-        # Deadline penalty: Reward workers with the same deadline
-        deadline_penalty = 0 if due_date in worker_data[worker]['deadlines'] else 1
-        deadline_reward = -0.5 if due_date in worker_data[worker]['deadlines'] else 0
-        
-        # Calculate total penalty
-        total_penalty = (w1 * workload_penalty) + (w2 * location_penalty) + (w3 * (deadline_penalty + deadline_reward))
-        
-        return total_penalty
-    
-    # Sort task groups by due date (earliest first)
-    sorted_task_groups = sorted(task_groups.items(), key=lambda x: x[0][1])
-    
-    # Assign tasks using heuristic scoring
-    new_assignments = []
-    for (location, due_date), group in sorted_task_groups:
-        for item in group:
-            # Pick the best worker using the heuristic
-            best_worker = min(workers, key=lambda w: heuristic(w, location, due_date))
-            
-            # Assign task to the best worker
-            new_assignments.append((best_worker, item[1]))  # (worker_id, serial_no)
-            
-            # Update worker data
-            workloads[best_worker] += 1  # Increment workload
-            worker_data[best_worker]['assigned_load'] += 1
-            worker_data[best_worker]['locations'].add(location)
-            worker_data[best_worker]['deadlines'].add(due_date)
-    
-    # Ensure minimum workload of 10 for each worker
-    min_workload = 10
-    total_items = sum(workloads.values())
-    
-    # First pass: identify workers below minimum
-    workers_below_min = [w for w in workers if workloads[w] < min_workload]
-    
-    if workers_below_min and total_items >= len(workers) * min_workload:
-        # Calculate how many items we need to redistribute
-        items_needed = sum(min_workload - workloads[w] for w in workers_below_min)
-        
-        # Identify workers who can give up items
-        donors = [w for w in workers if workloads[w] > min_workload]
-        
-        if donors:
-            # Calculate how many items each donor can give
-            items_to_take = {}
-            remaining_needed = items_needed
-            
-            # Sort donors by workload (highest first)
-            sorted_donors = sorted(donors, key=lambda w: workloads[w], reverse=True)
-            
-            for donor in sorted_donors:
-                # Calculate how many items this donor can give
-                available = workloads[donor] - min_workload
-                to_take = min(available, remaining_needed)
-                
-                if to_take > 0:
-                    items_to_take[donor] = to_take
-                    remaining_needed -= to_take
-                
-                if remaining_needed <= 0:
-                    break
-            
-            # Redistribute items
-            for donor, to_take in items_to_take.items():
-                workloads[donor] -= to_take
-                
-                # Distribute to workers below minimum
-                for recipient in workers_below_min:
-                    needed = min_workload - workloads[recipient]
-                    if needed > 0:
-                        given = min(needed, to_take)
-                        workloads[recipient] += given
-                        to_take -= given
-                    
-                    if to_take <= 0:
-                        break
-    
-    # Rebalance workload to ensure each worker is within ±5 tasks from average
-    avg_workload = get_avg_workload()
-    max_deviation = 5  # Maximum allowed deviation from average
-    
-    # Identify workers outside the allowed range
-    overloaded_workers = [w for w in workers if workloads[w] > avg_workload + max_deviation]
-    underloaded_workers = [w for w in workers if workloads[w] < avg_workload - max_deviation]
-    
-    # Only proceed with rebalancing if there are workers outside the allowed range
-    if overloaded_workers and underloaded_workers:
-        print(f"Rebalancing workload: Average = {avg_workload}, Allowed range = [{avg_workload - max_deviation}, {avg_workload + max_deviation}]")
-        print(f"Overloaded workers: {overloaded_workers}")
-        print(f"Underloaded workers: {underloaded_workers}")
-        
-        # Sort workers by workload (highest to lowest for overloaded, lowest to highest for underloaded)
-        overloaded_workers.sort(key=lambda w: workloads[w], reverse=True)
-        underloaded_workers.sort(key=lambda w: workloads[w])
-        
-        # Redistribute tasks from overloaded to underloaded workers
-        for donor in overloaded_workers:
-            # Calculate how many tasks need to be redistributed
-            excess = workloads[donor] - (avg_workload + max_deviation)
-            
-            if excess <= 0:
-                continue  # Skip if worker is now within range
-            
-            print(f"Worker {donor} needs to give up {excess} tasks")
-            
-            # Redistribute to underloaded workers
-            for recipient in underloaded_workers:
-                # Calculate how many tasks this recipient can take
-                deficit = (avg_workload - max_deviation) - workloads[recipient]
-                
-                if deficit <= 0:
-                    continue  # Skip if worker is now within range
-                
-                # Transfer tasks
-                transfer = min(excess, deficit)
-                workloads[donor] -= transfer
-                workloads[recipient] += transfer
-                excess -= transfer
-                
-                print(f"Transferred {transfer} tasks from {donor} to {recipient}")
-                
-                if excess <= 0:
-                    break  # Done redistributing from this donor
-    
-    # Calculate final workload distribution
-    final_workloads = [(worker, workloads[worker]) for worker in workers]
-    
-    # Print for debugging
-    print("Initial workloads:", {w: 0 for w in workers})
-    print("Final workloads after rebalancing:", dict(final_workloads))
-    print("Average workload:", avg_workload)
-    print("Allowed range:", [avg_workload - max_deviation, avg_workload + max_deviation])
-    print("Total items before:", len(calibration_items))
-    print("Total items after:", sum(load for _, load in final_workloads))
-    
-    return final_workloads
+    app.config['SCHEMA_VERSIONS'] = schema_versions
+    app.config['STARTUP_TIMINGS'] = timings
+    print(f"Startup: imports {timings['import_seconds']}s, app and migrations {timings['startup_seconds']}s, schema versions {schema_versions}")
+
+    return app
 
 if __name__ == "__main__":
-    # Create the malfunction reports table if it doesn't exist
-    create_malfunction_reports_table()
-    
-    # Print database schema information
-    try:
-        conn = get_db_connection()
-        if conn:
-            cursor = conn.cursor()
-            cursor.execute("PRAGMA table_info(bosch_equipment)")
-            columns = cursor.fetchall()
-            print("\n=== Database Schema for bosch_equipment ===")
-            for column in columns:
-                print(f"Column: {column}")
-            
-            # Get a sample row to understand the data
-            cursor.execute("SELECT * FROM bosch_equipment LIMIT 1")
-            sample_row = cursor.fetchone()
-            if sample_row:
-                print("\n=== Sample Row ===")
-                for i, column in enumerate(columns):
-                    column_name = column[1]
-                    value = sample_row[i] if i < len(sample_row) else None
-                    print(f"{column_name}: {value}")
-            
-            # Print malfunction_reports schema
-            cursor.execute("PRAGMA table_info(malfunction_reports)")
-            columns = cursor.fetchall()
-            print("\n=== Database Schema for malfunction_reports ===")
-            for column in columns:
-                print(f"Column: {column}")
-            
-            conn.close()
-    except Exception as e:
-        print(f"Error getting schema information: {e}")
-    
+    app = create_app()
     app.run(debug=True)
@@ -0,0 +1,122 @@
+import csv
+import datetime
+import io
+
+# Columns of a schedule row, in the order export queries select them
+SCHEDULE_COLUMNS = [
+    'index', 'serial_no', 'description', 'brand', 'calibrator', 'pic',
+    'external_cal', 'calibration__due', 'calibration_due_date'
+]
+
+# Rows fetched from the cursor (and written out) at a time
+SCHEDULE_BATCH_ROWS = 500
+
+# iCalendar content lines are folded at 75 octets (RFC 5545 3.1)
+ICS_LINE_OCTETS = 75
+
+
+def ics_escape(value):
+    # TEXT values escape backslash, ';', ',' and newlines
+    text = '' if value is None else str(value)
+    return (text.replace('\\', '\\\\').replace(';', '\\;').replace(',', '\\,')
+            .replace('\r\n', '\\n').replace('\n', '\\n'))
+
+
+def ics_line(line):
+    """
+    One content line with its CRLF, folded into continuation lines (starting
+    with a space) so that none is longer than 75 octets of UTF-8
+    """
+    parts = []
+    current = ''
+    current_octets = 0
+    for char in line:
+        octets = len(char.encode('utf-8'))
+        if current_octets + octets > ICS_LINE_OCTETS:
+            parts.append(current)
+            # The leading space of the continuation counts too
+            current, current_octets = ' ', 1
+        current += char
+        current_octets += octets
+    parts.append(current)
+    return '\r\n'.join(parts) + '\r\n'
+
+
+def _batches(cursor):
+    while True:
+        rows = cursor.fetchmany(SCHEDULE_BATCH_ROWS)
+        if not rows:
+            return
+        yield rows
+
+
+def ics_event(row, uid_prefix, stamp):
+    """
+    All-day VEVENT on the calibration due date of a schedule row, or '' when
+    the due date could not be parsed
+    """
+    tool = dict(zip(SCHEDULE_COLUMNS, row))
+    due_date = tool['calibration_due_date']
+    if not due_date:
+        return ''
+    start = datetime.date.fromisoformat(due_date)
+    # DTEND of an all-day event is exclusive: the next day
+    end = start + datetime.timedelta(days=1)
+    summary = f"Calibration due: {tool['description']} ({tool['serial_no']})"
+
+    description = '\n'.join([
+        f"Serial no: {tool['serial_no']}",
+        f"Brand: {tool['brand']}",
+        f"Calibrator: {tool['calibrator']}",
+        f"Calibration: {tool['external_cal']}",
+        f"PIC: {tool['pic']}",
+        f"Due: {tool['calibration__due']}",
+    ])
+    lines = [
+        'BEGIN:VEVENT',
+        f"UID:{uid_prefix}-{tool['index']}-{start.strftime('%Y%m%d')}",
+        f"DTSTAMP:{stamp}",
+        f"DTSTART;VALUE=DATE:{start.strftime('%Y%m%d')}",
+        f"DTEND;VALUE=DATE:{end.strftime('%Y%m%d')}",
+        f"SUMMARY:{ics_escape(summary)}",
+        f"DESCRIPTION:{ics_escape(description)}",
+        'CATEGORIES:Calibration',
+        'TRANSP:TRANSPARENT',
+        'END:VEVENT',
+    ]
+    return ''.join(ics_line(line) for line in lines)
+
+
+def iter_ics(cursor, calendar_name, uid_prefix, stamp):
+    """
+    Stream the schedule rows of cursor as an iCalendar file, yielding bytes
+    one batch of rows at a time. stamp (DTSTAMP, e.g. 20250606T080000Z)
+    should only change with the data, so unchanged schedules are identical.
+    """
+    header = [
+        'BEGIN:VCALENDAR',
+        'VERSION:2.0',
+        'PRODID:-//DL-WEEK//Calibration schedule//EN',
+        'CALSCALE:GREGORIAN',
+        'METHOD:PUBLISH',
+        f"X-WR-CALNAME:{ics_escape(calendar_name)}",
+    ]
+    yield ''.join(ics_line(line) for line in header).encode('utf-8')
+    for rows in _batches(cursor):
+        yield ''.join(ics_event(row, uid_prefix, stamp) for row in rows).encode('utf-8')
+    yield ics_line('END:VCALENDAR').encode('utf-8')
+
+
+def iter_csv(cursor):
+    # Stream the schedule rows of cursor as CSV with a header, one batch at a time
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(['id' if column == 'index' else column for column in SCHEDULE_COLUMNS])
+    for rows in _batches(cursor):
+        writer.writerows(rows)
+        yield buffer.getvalue().encode('utf-8')
+        buffer.seek(0)
+        buffer.truncate()
+    if buffer.tell():
+        # Header only, when there are no rows
+        yield buffer.getvalue().encode('utf-8')
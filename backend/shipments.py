@@ -0,0 +1,55 @@
+import datetime
+
+# Defaults for the batching planner
+DEFAULT_WINDOW_DAYS = 14
+DEFAULT_CAPACITY = 20
+DEFAULT_HORIZON_DAYS = 90
+
+
+def plan_shipments(items, window_days=DEFAULT_WINDOW_DAYS, capacity=DEFAULT_CAPACITY, today=None):
+    """
+    Group due calibrations into shipments, one pass over the items.
+
+    items are (calibrator, external_cal, due_date, tool) tuples sorted by
+    their first three fields, due_date a datetime.date and tool whatever
+    should be listed in the shipment. A shipment holds tools for one
+    calibrator and mode (Lab, In-House, ...), at most capacity of them, due
+    within window_days of the first one. Overdue tools count as due today
+    (today, or the local date when not given), so they go in the first
+    shipment.
+
+    Returns a list of shipments, each shipped by the earliest due date in it
+    """
+    today = today or datetime.date.today()
+    window = datetime.timedelta(days=window_days)
+
+    shipments = []
+    current = None
+    for calibrator, external_cal, item_due_date, tool in items:
+        key = (calibrator, external_cal)
+        due_date = max(item_due_date, today)
+
+        if (current is None
+                or current['key'] != key
+                or due_date - current['ship_by'] > window
+                or len(current['tools']) >= capacity):
+            current = {'key': key, 'ship_by': due_date, 'last_due': due_date, 'overdue': 0, 'tools': []}
+            shipments.append(current)
+
+        current['last_due'] = due_date
+        if item_due_date < today:
+            current['overdue'] += 1
+        current['tools'].append(tool)
+
+    return [
+        {
+            "calibrator": shipment['key'][0],
+            "external_cal": shipment['key'][1],
+            "ship_by": shipment['ship_by'].isoformat(),
+            "last_due": shipment['last_due'].isoformat(),
+            "size": len(shipment['tools']),
+            "overdue": shipment['overdue'],
+            "tools": shipment['tools']
+        }
+        for shipment in shipments
+    ]
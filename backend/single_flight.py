@@ -0,0 +1,98 @@
+import collections
+import threading
+import time
+
+
+class _Flight:
+    # One in-progress computation that other callers can wait for
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+
+class SingleFlightCache:
+    """
+    Runs each expensive computation once per key: callers asking for a key
+    that is already being computed wait for that computation and share its
+    result, and results are kept for ttl seconds so a burst of identical
+    requests costs one computation. Errors are shared with the callers that
+    were waiting but never cached.
+
+    Keys should include everything the result depends on (e.g. the data
+    version), so a cached result is never served for changed data.
+    """
+
+    def __init__(self, ttl=30.0, max_entries=64):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.hits = 0
+        self.shared = 0
+        self.computed = 0
+        self._results = collections.OrderedDict()
+        self._flights = {}
+        self._lock = threading.Lock()
+
+    def get_or_compute(self, key, compute):
+        """
+        Return (result, status): status is 'hit' (cached result), 'shared'
+        (waited for another caller's computation) or 'computed'
+        """
+        with self._lock:
+            cached = self._results.get(key)
+            if cached and cached[0] > time.monotonic():
+                self._results.move_to_end(key)
+                self.hits += 1
+                return cached[1], 'hit'
+
+            flight = self._flights.get(key)
+            leader = flight is None
+            if leader:
+                flight = self._flights[key] = _Flight()
+
+        if not leader:
+            flight.done.wait()
+            if flight.error is not None:
+                raise flight.error
+            with self._lock:
+                self.shared += 1
+            return flight.result, 'shared'
+
+        try:
+            flight.result = compute()
+        except Exception as e:
+            flight.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._flights[key]
+                if flight.error is None:
+                    self.computed += 1
+                    if self.ttl > 0:
+                        self._store(key, flight.result)
+            flight.done.set()
+
+        return flight.result, 'computed'
+
+    def clear(self):
+        with self._lock:
+            self._results.clear()
+
+    def stats(self):
+        with self._lock:
+            return {
+                "entries": len(self._results),
+                "in_flight": len(self._flights),
+                "hits": self.hits,
+                "shared": self.shared,
+                "computed": self.computed
+            }
+
+    def _store(self, key, result):
+        # Called with the lock held: drop expired entries, then the oldest ones
+        now = time.monotonic()
+        for stale_key in [k for k, (expires, _) in self._results.items() if expires <= now]:
+            del self._results[stale_key]
+        self._results[key] = (now + self.ttl, result)
+        while len(self._results) > self.max_entries:
+            self._results.popitem(last=False)
@@ -0,0 +1,89 @@
+import queue
+import threading
+import time
+
+
+class WriteBehindBuffer:
+    """
+    Bounded in-memory queue of rows that a background thread writes out in
+    batches, so the request that produced a row never waits on the disk.
+
+    A batch is flushed when batch_size rows are waiting or flush_interval
+    seconds have passed, whichever comes first. stop() flushes what is left.
+    When the queue is full, add() drops the row and returns False instead of
+    blocking the request.
+    """
+
+    def __init__(self, name, write_batch, max_size=10000, batch_size=500, flush_interval=1.0):
+        self.name = name
+        self.write_batch = write_batch
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.dropped = 0
+        self.written = 0
+        self._queue = queue.Queue(maxsize=max_size)
+        self._stopping = threading.Event()
+        self._thread = None
+        self._lock = threading.Lock()
+
+    def start(self):
+        with self._lock:
+            if self._thread and self._thread.is_alive():
+                return
+            self._stopping.clear()
+            self._thread = threading.Thread(target=self._run, name=f"{self.name}-writer", daemon=True)
+            self._thread.start()
+
+    def add(self, row):
+        try:
+            self._queue.put_nowait(row)
+            return True
+        except queue.Full:
+            self.dropped += 1
+            return False
+
+    def stop(self, timeout=5.0):
+        # Wake the writer, let it drain the queue, then wait for it to exit
+        self._stopping.set()
+        if self._thread:
+            self._thread.join(timeout)
+        # Anything added after the thread exited (or if it never started)
+        self._flush(self._take_batch(block=False, limit=None))
+
+    def stats(self):
+        return {
+            "queued": self._queue.qsize(),
+            "written": self.written,
+            "dropped": self.dropped
+        }
+
+    def _take_batch(self, block, limit):
+        batch = []
+        deadline = time.monotonic() + self.flush_interval
+        while limit is None or len(batch) < limit:
+            timeout = deadline - time.monotonic()
+            try:
+                if block and timeout > 0:
+                    batch.append(self._queue.get(timeout=timeout))
+                else:
+                    batch.append(self._queue.get_nowait())
+            except queue.Empty:
+                break
+        return batch
+
+    def _flush(self, batch):
+        if not batch:
+            return
+        try:
+            self.write_batch(batch)
+            self.written += len(batch)
+        except Exception as e:
+            # Logging is best effort: report and drop the batch rather than retry forever
+            self.dropped += len(batch)
+            print(f"Error flushing {len(batch)} rows from {self.name} buffer: {e}")
+
+    def _run(self):
+        while not self._stopping.is_set():
+            self._flush(self._take_batch(block=True, limit=self.batch_size))
+        # Final drain on shutdown
+        self._flush(self._take_batch(block=False, limit=None))
@@ -26,6 +26,8 @@ export function CalibrationSchedule() {
   const [workerData, setWorkerData] = useState<WorkerData[]>([]);
   const [error, setError] = useState<string | null>(null);
   const [useBackend, setUseBackend] = useState(true);
+  // The previewed allocation, sent back on confirm so exactly it is applied
+  const [preview, setPreview] = useState<{ reassignments: any[]; data_version: number | null } | null>(null);
 
   // Find the maximum value for scaling
   const maxCurrentValue = Math.max(...workerData.map(worker => worker.old_workload));
@@ -147,6 +149,7 @@ export function CalibrationSchedule() {
         
         console.log("Processed optimized data:", optimizedData);
         setWorkerData(optimizedData);
+        setPreview({ reassignments: data.reassignments, data_version: data.data_version });
         setIsOptimized(true);
       } else {
         throw new Error("Invalid optimized data format");
@@ -194,8 +197,18 @@ export function CalibrationSchedule() {
         headers: {
           'Content-Type': 'application/json',
         },
+        body: JSON.stringify(preview ?? {}),
       });
       
+      if (response.status === 409) {
+        // The data changed since the preview: show the current loads and optimize again
+        await fetchWorkerData();
+        setIsOptimized(false);
+        setPreview(null);
+        setError('The data changed since the optimization. Please optimize again.');
+        return;
+      }
+
       if (!response.ok) {
         throw new Error('Failed to update worker allocation');
       }
@@ -203,6 +216,7 @@ export function CalibrationSchedule() {
       // Refresh worker data
       await fetchWorkerData();
       setIsOptimized(false);
+      setPreview(null);
       alert("Changes confirmed! Database updated with new work allocation.");
     } catch (err) {
       console.error('Error confirming changes:', err);